@@ -1,10 +1,25 @@
-import json
 import streamlit as st
-import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import price_client
+import bulk_fetch
+import price_refresher
+import price_status
+import price_store
+import price_snapshot
+import history_chart
+import tradeup_engine
+import contract_planner
+import inventory_partition
+import inventory_import
+import ev_engine
+import monte_carlo
+import inverse_table
+import recipe_scan
+import sensitivity
+import float_heatmap
 from pathlib import Path
 from matplotlib import font_manager
 import matplotlib.pyplot as plt
+import numpy as np
 import os
 
 # ================== 字体 ==================
@@ -33,7 +48,8 @@ plt.rcParams["axes.unicode_minus"] = False
 
 # ================== 基础配置 ==================
 API_KEY = st.secrets["API_KEY"]
-PRICE_URL = "https://open.steamdt.com/open/cs2/v1/price/single"
+CASE_KEY = "nightmare"
+# 老的 JSON 数据文件：第一次启动时导入价格库
 DATA_FILE = Path("knives.json")
 
 # ================== 名称映射（刀 + 红皮） ==================
@@ -86,54 +102,55 @@ STEAMDT_NAME_MAP = {
 }
 
 # ================== 默认数据 ==================
-DEFAULT_KNIVES = [
+# 只读（price_snapshot.freeze），所有会话共用也不会被谁改掉
+DEFAULT_KNIVES = price_snapshot.freeze([
     # Shadow Daggers
-    {"name": "暗影双匕｜澄澈之水", "min_price": 0},
-    {"name": "暗影双匕｜黑色层压板", "min_price": 0},
-    {"name": "暗影双匕｜自由之手", "min_price": 0},
-    {"name": "暗影双匕｜传说", "min_price": 0},
-    {"name": "暗影双匕｜自动化", "min_price": 0},
-    {"name": "暗影双匕｜伽玛多普勒", "min_price": 0},
+    {"name": "暗影双匕｜澄澈之水", "prices": {}},
+    {"name": "暗影双匕｜黑色层压板", "prices": {}},
+    {"name": "暗影双匕｜自由之手", "prices": {}},
+    {"name": "暗影双匕｜传说", "prices": {}},
+    {"name": "暗影双匕｜自动化", "prices": {}},
+    {"name": "暗影双匕｜伽玛多普勒", "prices": {}},
 
     # Bowie Knife
-    {"name": "鲍伊猎刀｜澄澈之水", "min_price": 0},
-    {"name": "鲍伊猎刀｜黑色层压板", "min_price": 0},
-    {"name": "鲍伊猎刀｜自由之手", "min_price": 0},
-    {"name": "鲍伊猎刀｜传说", "min_price": 0},
-    {"name": "鲍伊猎刀｜自动化", "min_price": 0},
-    {"name": "鲍伊猎刀｜伽玛多普勒", "min_price": 0},
+    {"name": "鲍伊猎刀｜澄澈之水", "prices": {}},
+    {"name": "鲍伊猎刀｜黑色层压板", "prices": {}},
+    {"name": "鲍伊猎刀｜自由之手", "prices": {}},
+    {"name": "鲍伊猎刀｜传说", "prices": {}},
+    {"name": "鲍伊猎刀｜自动化", "prices": {}},
+    {"name": "鲍伊猎刀｜伽玛多普勒", "prices": {}},
 
     # Huntsman Knife
-    {"name": "猎杀者匕首｜澄澈之水", "min_price": 0},
-    {"name": "猎杀者匕首｜黑色层压板", "min_price": 0},
-    {"name": "猎杀者匕首｜自由之手", "min_price": 0},
-    {"name": "猎杀者匕首｜传说", "min_price": 0},
-    {"name": "猎杀者匕首｜自动化", "min_price": 0},
-    {"name": "猎杀者匕首｜伽玛多普勒", "min_price": 0},
+    {"name": "猎杀者匕首｜澄澈之水", "prices": {}},
+    {"name": "猎杀者匕首｜黑色层压板", "prices": {}},
+    {"name": "猎杀者匕首｜自由之手", "prices": {}},
+    {"name": "猎杀者匕首｜传说", "prices": {}},
+    {"name": "猎杀者匕首｜自动化", "prices": {}},
+    {"name": "猎杀者匕首｜伽玛多普勒", "prices": {}},
 
     # Falchion Knife
-    {"name": "弯刀｜黑色层压板", "min_price": 0},
-    {"name": "弯刀｜澄澈之水", "min_price": 0},
-    {"name": "弯刀｜自由之手", "min_price": 0},
-    {"name": "弯刀｜传说", "min_price": 0},
-    {"name": "弯刀｜自动化", "min_price": 0},
-    {"name": "弯刀｜伽玛多普勒", "min_price": 0},
+    {"name": "弯刀｜黑色层压板", "prices": {}},
+    {"name": "弯刀｜澄澈之水", "prices": {}},
+    {"name": "弯刀｜自由之手", "prices": {}},
+    {"name": "弯刀｜传说", "prices": {}},
+    {"name": "弯刀｜自动化", "prices": {}},
+    {"name": "弯刀｜伽玛多普勒", "prices": {}},
 
     # Butterfly Knife
-    {"name": "蝴蝶刀｜黑色层压板", "min_price": 0},
-    {"name": "蝴蝶刀｜澄澈之水", "min_price": 0},
-    {"name": "蝴蝶刀｜自由之手", "min_price": 0},
-    {"name": "蝴蝶刀｜传说", "min_price": 0},
-    {"name": "蝴蝶刀｜自动化", "min_price": 0},
-    {"name": "蝴蝶刀｜伽玛多普勒", "min_price": 0},
-]
-
-DEFAULT_WEAPONS = [
-    {"name": "MP9 | 星使", "min_price": 0},
-    {"name": "AK-47 | 夜愿", "min_price": 0},
-    {"name": "沙漠之鹰 | 纵横波涛", "min_price": 0},
-    {"name": "AK-47 | 抽象派 1337", "min_price": 0},
-]
+    {"name": "蝴蝶刀｜黑色层压板", "prices": {}},
+    {"name": "蝴蝶刀｜澄澈之水", "prices": {}},
+    {"name": "蝴蝶刀｜自由之手", "prices": {}},
+    {"name": "蝴蝶刀｜传说", "prices": {}},
+    {"name": "蝴蝶刀｜自动化", "prices": {}},
+    {"name": "蝴蝶刀｜伽玛多普勒", "prices": {}},
+])
+
+DEFAULT_WEAPONS = price_snapshot.freeze([
+    {"name": "MP9 | 星使", "prices": {}},
+    {"name": "AK-47 | 夜愿", "prices": {}},
+    {"name": "沙漠之鹰 | 纵横波涛", "prices": {}},
+    {"name": "AK-47 | 抽象派 1337", "prices": {}},
+])
 
 # ================== 材料枪磨损区间 ==================
 WEAR_RANGE = {
@@ -169,20 +186,11 @@ GAMMA_TIER = {
     "崭新出厂 (FN)": (0.00, 0.07),
     "略有磨损 (MW)": (0.07, 0.08),
 }
+GAMMA_MIN = 0.00
+GAMMA_MAX = 0.08
 
-# ========== 工具函数：材料磨损 -> 刀磨损 ==========
-def mat_float_to_knife_float(material_name: str, mat_float: float):
-    if material_name not in WEAR_RANGE:
-        return None
-    m_min, m_max = WEAR_RANGE[material_name]
-    if m_max <= m_min:
-        return None
-
-    mf = max(m_min, min(m_max, mat_float))
-    mf = max(0.0, min(1.0, mf))
-    return round(mf, 6)
-
-
+# ========== 工具函数：磨损 -> 档位 ==========
+# 材料枪的磨损档位（按档位取枪价用），分界和刀一样
 def classify_knife_tier(knife_float: float):
     for tier_name, (lo, hi) in KNIFE_TIER.items():
         if lo <= knife_float <= hi:
@@ -190,42 +198,27 @@ def classify_knife_tier(knife_float: float):
     return None
 
 
-def calc_max_material_float_for_knife_tier(
-    material_name: str,
-    target_knife_max: float,
-    gamma_mode: bool = False,
-):
-    """
-    给定：材料枪 + 想要的刀成色的上限
-    返回：这把材料枪最高能用多少磨损（考虑成品刀区间）
-    """
-    if material_name not in WEAR_RANGE:
-        return None
-
-    mat_min, mat_max = WEAR_RANGE[material_name]
+# 向量化计算：一次算很多组 5 把材料的刀磨损 / 成色，计算器和批量分析都用它
+# 和反推一样按材料区间里的相对位置线性映射到刀区间（伽玛模式映射到 GAMMA 区间）
+ENGINE = tradeup_engine.TradeUpEngine(WEAR_RANGE, KNIFE_MIN, KNIFE_MAX, KNIFE_TIER)
+GAMMA_ENGINE = tradeup_engine.TradeUpEngine(WEAR_RANGE, GAMMA_MIN, GAMMA_MAX, GAMMA_TIER)
 
-    if gamma_mode:
-        out_min, out_max = 0.0, 0.08
-    else:
-        out_min, out_max = KNIFE_MIN, KNIFE_MAX
-
-    if out_max <= out_min:
-        return None
+# 刀池各档位的价格统计（增量维护），期望收益面板用
+EV_STATS = ev_engine.OutcomeStats()
 
-    ratio = (target_knife_max - out_min) / (out_max - out_min)
-    if ratio < 0:
-        return None
-    ratio = min(ratio, 1.0)
 
-    mat_float = mat_min + ratio * (mat_max - mat_min)
-    return min(mat_float, mat_max)
+def _tier_reachable(material_name: str, tier_name_cn: str):
+    """材料枪的磨损区间够得着这个档位才有挂单（比如 血腥运动 最高 0.45，就没有战痕累累）"""
+    m_min, m_max = WEAR_RANGE[material_name]
+    lo, hi = KNIFE_TIER[tier_name_cn]
+    return lo < m_max and hi > m_min
 
 
 def build_market_hash(ch_name: str, tier_name_cn: str | None):
     """
     中文名 + 磨损档位 -> marketHashName
     - 伽玛多普勒始终 Factory New
-    - 刀用档位，枪 tier_name_cn None 时默认 FT
+    - 刀用档位，枪 tier_name_cn None 时默认 FT；枪的磨损区间够不着的档位返回 None
     """
     base = STEAMDT_NAME_MAP.get(ch_name)
     if not base:
@@ -235,6 +228,9 @@ def build_market_hash(ch_name: str, tier_name_cn: str | None):
     if tier_name_cn is None:
         return base + " (Field-Tested)"
 
+    if ch_name in WEAR_RANGE and not _tier_reachable(ch_name, tier_name_cn):
+        return None
+
     # 伽玛多普勒强制 Factory New
     if "Gamma Doppler" in base:
         return base + " (Factory New)"
@@ -243,61 +239,267 @@ def build_market_hash(ch_name: str, tier_name_cn: str | None):
     return base + f" ({tier_en})"
 
 
-# ================== 文件读写 ==================
-def load_data():
-    if not DATA_FILE.exists():
-        return DEFAULT_KNIVES, DEFAULT_WEAPONS
-    with DATA_FILE.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+# ================== 价格库读写 ==================
+# 老数据只有一个 min_price，不知道是按哪个档位拉的，统一当成默认的久经沙场
+LEGACY_TIER = "久经沙场 (FT)"
+
+
+def _legacy_rows(data, file_mtime: float):
+    """老 JSON 数据文件 -> 价格库的行（只在第一次导入时用）"""
     if isinstance(data, list):
-        return data, DEFAULT_WEAPONS
-    return data.get("knives", DEFAULT_KNIVES), data.get("weapons", DEFAULT_WEAPONS)
+        items = data
+    else:
+        items = data.get("knives", []) + data.get("weapons", [])
+
+    rows = {}
+    for i in items:
+        prices = i.get("prices")
+        if prices is None:
+            prices = {LEGACY_TIER: i.get("min_price", 0)}
+        fetched = i.get("fetched_at", {})
+        vols = i.get("volatility", {})
+        for tier_cn, price in prices.items():
+            # 只按一个磨损拉价的刀，老数据里各档位（包括默认的久经沙场）都记到拉价的那一档，只留一行
+            key = (i["name"], _price_tier(i["name"], tier_cn))
+            if price and key not in rows:
+                rows[key] = (
+                    *key,
+                    float(price),
+                    fetched.get(tier_cn) or file_mtime,
+                    vols.get(tier_cn, 0.0),
+                )
+    return list(rows.values())
+
+
+def _items_from_rows(defaults, rows):
+    items = []
+    for d in defaults:
+        item = {"name": d["name"], "prices": {}, "fetched_at": {}, "volatility": {}}
+        for tier_cn in TIER_EN_MAP:
+            row = rows.get((d["name"], tier_cn))
+            if row:
+                price, fetched_at, volatility = row
+                item["prices"][tier_cn] = price
+                item["fetched_at"][tier_cn] = fetched_at
+                item["volatility"][tier_cn] = volatility
+        items.append(price_snapshot.freeze(item))
+    return tuple(items)
+
+
+def _build_table(rows):
+    return _items_from_rows(DEFAULT_KNIVES, rows), _items_from_rows(DEFAULT_WEAPONS, rows)
 
 
-def save_data(knives, weapons):
-    with DATA_FILE.open("w", encoding="utf-8") as f:
-        json.dump({"knives": knives, "weapons": weapons}, f, ensure_ascii=False, indent=2)
+def load_data():
+    """
+    本页刀 / 枪列表：进程内所有会话共享一份，价格库版本变了才重建
+    返回值是只读快照，要改用 price_snapshot.evolve 写时复制
+    """
+    return price_store.cached_table(CASE_KEY, _build_table)
 
 
+def _hash_index():
+    """
+    marketHashName -> [(物品名, 档位)]，拉到新价格时用来定位要写的行
+    只按一个磨损拉价的刀（多普勒只有 FN 之类），各档位是同一个 marketHashName，只记它本身那一档
+    """
+    index = {}
+    for name in STEAMDT_NAME_MAP:
+        for tier_cn in TIER_EN_MAP:
+            mh = build_market_hash(name, tier_cn)
+            if mh and mh.endswith(f"({TIER_EN_MAP[tier_cn]})"):
+                index.setdefault(mh, []).append((name, tier_cn))
+    return index
+
+
+HASH_INDEX = _hash_index()
+
+
+def _shared_tiers():
+    """(物品名, 档位) -> 价格实际存在哪一档，只列和自己不一样的（比如多普勒的 MW / FT ... -> FN）"""
+    shared = {}
+    for name in STEAMDT_NAME_MAP:
+        for tier_cn in TIER_EN_MAP:
+            mh = build_market_hash(name, tier_cn)
+            if mh and HASH_INDEX[mh][0][1] != tier_cn:
+                shared[(name, tier_cn)] = HASH_INDEX[mh][0][1]
+    return shared
+
+
+SHARED_TIER = _shared_tiers()
+
+
+def _price_tier(name: str, tier_name_cn: str):
+    """这个档位的价格存在哪一档：只按一个磨损拉价的刀是拉价的那一档，其他就是自己"""
+    return SHARED_TIER.get((name, tier_name_cn), tier_name_cn)
+
+
+def _own_tiers(name: str):
+    """价格真正存在这把刀 / 枪自己名下的档位（每个只拉一次、只存一行）"""
+    return [t for t in TIER_EN_MAP if (name, t) not in SHARED_TIER]
+
+
+def _on_new_price(market_hash, latest):
+    # 拉到新价格就点更新对应的几行，不再整份重写
+    refs = HASH_INDEX.get(market_hash)
+    if refs:
+        price_store.upsert_prices(CASE_KEY, [
+            (name, tier_cn, latest.price, latest.fetched_at, latest.volatility)
+            for name, tier_cn in refs
+        ])
+
 # ================== 拉价 ==================
 def fetch_lowest_price(market_hash):
-    try:
-        r = requests.get(
-            PRICE_URL,
-            headers={"Authorization": f"Bearer {API_KEY}"},
-            params={"marketHashName": market_hash},
-            timeout=10,
-        )
-        data = r.json()
-        if not data.get("success"):
-            return None
-        prices = [p.get("sellPrice") for p in data.get("data", []) if p.get("sellPrice")]
-        return min(prices) if prices else None
-    except Exception:
-        return None
+    return price_client.fetch_lowest_price(market_hash, API_KEY)
+
+
+def price_of(item, tier_name_cn: str):
+    """某把刀 / 枪在某个磨损档位下的价格，没拉过返回 0"""
+    return item.get("prices", {}).get(_price_tier(item["name"], tier_name_cn), 0)
+
 
+def fetched_at_of(item, tier_name_cn: str):
+    """某个档位价格的拉取时间戳，没拉过返回 None"""
+    return item.get("fetched_at", {}).get(_price_tier(item["name"], tier_name_cn))
 
-def update_all(items, tier_name_cn: str | None = None):
+
+def _with_latest(item, tier_name_cn: str, latest):
+    """写时复制：返回某个档位套上快照价格 / 拉价时间 / 波动的新 item，原 item 不动"""
+    return price_snapshot.evolve(item, {
+        ("prices", tier_name_cn): float(latest.price),
+        ("fetched_at", tier_name_cn): latest.fetched_at,
+        ("volatility", tier_name_cn): latest.volatility,
+    })
+
+
+def update_all(items, tiers=None):
     """
-    批量刷新价格：
-    - items 可以是刀或枪
-    - tier_name_cn 是刀磨损档位（枪传 None）
+    批量刷新价格：一次把 items 在每个磨损档位下的价格都拉回来
+    - items 是刀或枪（只读快照，不会被原地修改）
+    - tiers 默认是 TIER_EN_MAP 里的全部档位
+    - 只认 FN / WW 的刀，各档位会映射到同一个 marketHashName，只拉一次、只写那一档
+    返回 (新的 items tuple, 更新了几个价格)，拉到新价格的 item 是写时复制出来的新快照
+    后台增量刷新走 price_refresher，这里只给侧边栏的“刷新当前”按钮用
     """
+    items = tuple(items)
+    tiers = list(TIER_EN_MAP) if tiers is None else tiers
+
+    by_hash = {}
+    for idx, i in enumerate(items):
+        for tier_cn in tiers:
+            mh = build_market_hash(i["name"], tier_cn)
+            ref = (idx, _price_tier(i["name"], tier_cn))
+            if mh and ref not in by_hash.get(mh, []):
+                by_hash.setdefault(mh, []).append(ref)
+
     updated = 0
-    with ThreadPoolExecutor(max_workers=8) as ex:
-        futs = {}
-        for i in items:
-            mh = build_market_hash(i["name"], tier_name_cn)
-            if mh:
-                futs[ex.submit(fetch_lowest_price, mh)] = i
-
-        for fut in as_completed(futs):
-            item = futs[fut]
-            p = fut.result()
-            if p:
-                item["min_price"] = float(p)
+
+    def on_result(mh, p):
+        nonlocal items, updated
+        latest = price_client.latest_price(mh) if p else None
+        if latest:
+            for idx, tier_cn in by_hash[mh]:
+                items = price_snapshot.replace_at(items, idx, _with_latest(items[idx], tier_cn, latest))
                 updated += 1
-    return updated
+
+    bulk_fetch.fetch_many(list(by_hash), API_KEY, on_result=on_result)
+    return items, updated
+
+
+def refresh_hashes():
+    """后台刷新用：本页所有刀 / 枪在每个档位下的 marketHashName"""
+    return list(HASH_INDEX)
+
+
+def fetched_times(items):
+    """本页每个价格的拉取时间（没拉过的是 None；没有 marketHashName 的档位不算，共用一行的档位只算一次）"""
+    return [
+        fetched_at_of(i, tier_cn)
+        for i in items for tier_cn in _own_tiers(i["name"])
+        if build_market_hash(i["name"], tier_cn)
+    ]
+
+
+def tier_prices(items):
+    """每个磨损档位的成品均价（只算拉到价格的），没有价格的档位是 None"""
+    out = {}
+    for tier_cn in TIER_EN_MAP:
+        prices = [price_of(i, tier_cn) for i in items if price_of(i, tier_cn)]
+        out[tier_cn] = sum(prices) / len(prices) if prices else None
+    return out
+
+
+def material_cost(mat_sel, weapons):
+    """
+    5 把材料的总价：每把按自己的磨损落在哪个档位（和刀的档位分界一样）取那一档的枪价
+    返回 (总价, 没价格的材料名)
+    """
+    by_name = {w["name"]: w for w in weapons}
+    cost, missing = 0.0, []
+    for name, wear in mat_sel:
+        p = price_of(by_name[name], classify_knife_tier(wear)) if name in by_name else 0
+        if not p:
+            missing.append(name)
+        cost += p or 0
+    return cost, missing
+
+
+def scan_recipes():
+    """
+    首页配方扫描用：只读缓存价格，不拉价
+    材料价取磨损能用（档位下限不超过反推出的最高磨损）的档位里最便宜的那档
+    返回 (配方列表, 本页价格的拉取时间)
+    """
+    knives, weapons = load_data()
+    EV_STATS.sync(knives, TIER_EN_MAP, price_of)
+    by_name = {w["name"]: w for w in weapons}
+
+    def unit_cost(material, max_float):
+        prices = [price_of(by_name[material], t) for t, (lo, _) in KNIFE_TIER.items() if lo <= max_float]
+        prices = [p for p in prices if p]
+        return min(prices) if prices else None
+
+    return recipe_scan.scan(ENGINE, EV_STATS, unit_cost), fetched_times(knives + weapons)
+
+
+def float_grid():
+    """
+    材料磨损 × 期望利润网格（只用普通刀池），同一份价格快照只算一次
+    材料价和 material_cost 一样：按材料磨损落在哪个档位取那一档的枪价
+    """
+    table = load_data()
+
+    def build():
+        knives, weapons = table
+        by_name = {w["name"]: w for w in weapons}
+        # (材料, 档位) 的枪价表，最后补一列 NaN 给匹配不到档位的 -1
+        prices = np.array([
+            [price_of(by_name[m], t) or np.nan for t in KNIFE_TIER] + [np.nan]
+            for m in ENGINE.materials
+        ])
+        rows = np.arange(len(ENGINE.materials))[:, None]
+        return float_heatmap.profit_grid(ENGINE, tier_prices(knives), lambda grid: prices[rows, ENGINE.classify(grid)])
+
+    return float_heatmap.cached_grid(CASE_KEY, table, build)
+
+
+def seed_from_store():
+    """把价格库里带时间戳的价格灌进进程快照，后台增量刷新就知道哪些还新"""
+    for items in load_data():
+        for i in items:
+            for tier_cn in _own_tiers(i["name"]):
+                price_client.seed_latest(
+                    build_market_hash(i["name"], tier_cn),
+                    price_of(i, tier_cn),
+                    fetched_at_of(i, tier_cn),
+                    i.get("volatility", {}).get(tier_cn, 0.0),
+                )
+
+
+price_store.import_legacy_json(CASE_KEY, DATA_FILE, _legacy_rows)
+seed_from_store()
+price_client.add_listener(_on_new_price)
+price_refresher.register(CASE_KEY, refresh_hashes, API_KEY)
 
 
 # ================== 页面渲染函数 ==================
@@ -307,17 +509,12 @@ def render():
     只在 main.py 里调用：page_nightmare_riptide.render()
     """
 
-    # 1. 初始化本页面自己的状态（night_ 前缀）
-    if "night_knives" not in st.session_state or "night_weapons" not in st.session_state:
-        k, w = load_data()
-        st.session_state.night_knives = k
-        st.session_state.night_weapons = w
-
-    knives = st.session_state.night_knives
-    weapons = st.session_state.night_weapons
+    # 1. 本页价格表：进程内共享的只读快照，价格库有更新才重建，会话里不再各存一份
+    knives, weapons = load_data()
 
     # 2. 页面标题
     st.title("🎮 CS2 梦魇 / 激流大行动 炼金收益展示")
+    freshness_box = st.container()
 
     # ================== Sidebar：刀 ==================
     st.sidebar.subheader("🔪 刀操作")
@@ -341,23 +538,23 @@ def render():
     btn_k2 = col2.button("🔁 刷新全部刀", key="night_btn_knife_all")
 
     if btn_k1:
-        mh = build_market_hash(cur_knife["name"], knife_tier_choice)
-        if mh:
-            p = fetch_lowest_price(mh)
-            if p:
-                cur_knife["min_price"] = float(p)
-                st.sidebar.success(f"✅ 刀已更新：{p}")
+        if build_market_hash(cur_knife["name"], knife_tier_choice):
+            # 一次把这把刀 5 个档位都拉回来，之后切档位不用再拉
+            (cur_knife,), updated = update_all([cur_knife])
+            if updated:
+                # 新价格已写进价格库，整页价格表重新读一次
+                knives, weapons = load_data()
+                st.sidebar.success(f"✅ 刀已更新：{price_of(cur_knife, knife_tier_choice)}")
             else:
                 st.sidebar.error("❌ 刀没拉到价格")
         else:
             st.sidebar.error("❌ 没配置映射")
 
     if btn_k2:
-        with st.spinner("⚙️ 正在刷新所有刀..."):
-            n = update_all(knives, knife_tier_choice)
-        st.sidebar.success(f"✅ 已刷新 {n} 把刀")
+        price_refresher.request_refresh(CASE_KEY)
+        st.sidebar.info("⏳ 已提交后台刷新，完成后页面会自动更新")
 
-    st.sidebar.markdown(f"当前刀价：**{cur_knife['min_price']:.2f}** 元")
+    st.sidebar.markdown(f"当前刀价：**{price_of(cur_knife, knife_tier_choice):.2f}** 元")
 
     # ================== Sidebar：枪 ==================
     st.sidebar.markdown("---")
@@ -383,26 +580,25 @@ def render():
     btn_w2 = col4.button("💥 刷新全部枪", key="night_btn_weapon_all")
 
     if btn_w1:
-        mh = build_market_hash(cur_weapon["name"], weapon_tier_choice)
-        if mh:
-            p = fetch_lowest_price(mh)
-            if p:
-                cur_weapon["min_price"] = float(p)
+        if build_market_hash(cur_weapon["name"], weapon_tier_choice):
+            (cur_weapon,), updated = update_all([cur_weapon])
+            if updated:
+                knives, weapons = load_data()
                 st.sidebar.success("✅ 当前这把枪已更新")
             else:
                 st.sidebar.error("❌ 枪没拉到价格")
         else:
-            st.sidebar.error("❌ 这把枪没配置映射")
+            st.sidebar.error("❌ 这把枪没配置映射，或者它的磨损区间没有这个档位")
 
     if btn_w2:
-        with st.spinner("⚙️ 正在刷新所有枪..."):
-            n = update_all(weapons, weapon_tier_choice)
-        st.sidebar.success(f"✅ 已刷新 {n} 把枪")
+        price_refresher.request_refresh(CASE_KEY)
+        st.sidebar.info("⏳ 已提交后台刷新，完成后页面会自动更新")
 
-    st.sidebar.markdown(f"当前枪价：**{cur_weapon['min_price']:.2f}** 元")
+    st.sidebar.markdown(f"当前枪价：**{price_of(cur_weapon, weapon_tier_choice):.2f}** 元")
 
-    # 状态更新后保存
-    save_data(knives, weapons)
+    # 价格新鲜度：旧了就后台重新拉，不阻塞本次渲染
+    with freshness_box:
+        price_status.render_freshness(CASE_KEY, fetched_times(knives + weapons))
 
     # ================== 主区：反推材料最大磨损 ==================
     st.subheader("🧮 想要这种刀外观，我的材料枪最多能用多少磨损？")
@@ -428,32 +624,159 @@ def render():
                 list(GAMMA_TIER.keys()),
                 key="night_gamma_tier"
             )
-            tier_min, tier_max = GAMMA_TIER[sel_tier]
         else:
             sel_tier = st.selectbox(
                 "想要的刀外观：",
                 list(KNIFE_TIER.keys()),
                 key="night_knife_target_tier"
             )
-            tier_min, tier_max = KNIFE_TIER[sel_tier]
 
-    if st.button("计算最大可用材料磨损", key="night_btn_calc_inverse"):
-        res = calc_max_material_float_for_knife_tier(sel_mat, tier_max, gamma_mode=gamma_mode)
-        if res is None:
-            st.error("无法计算，请检查区间。")
-        else:
-            target_name = "伽玛多普勒" if gamma_mode else "这把刀"
-            st.success(
-                f"要合出 **{sel_tier}** 的{target_name}，"
-                f"{sel_mat} 的磨损应 ≤ **{res:.6f}**"
+    # 反推表在启动时就算好了，选完直接查
+    res = (GAMMA_ENGINE if gamma_mode else ENGINE).max_material_float(sel_mat, sel_tier)
+    if res is None:
+        st.error("无法计算，请检查区间。")
+    else:
+        target_name = "伽玛多普勒" if gamma_mode else "这把刀"
+        st.success(
+            f"要合出 **{sel_tier}** 的{target_name}，"
+            f"{sel_mat} 的磨损应 ≤ **{res:.6f}**"
+        )
+        st.caption("建议再多留 0.001~0.003 安全余量。")
+
+    inverse_table.render_inverse_table({"刀": ENGINE, "伽玛": GAMMA_ENGINE}, key_prefix="night")
+
+    # ========== 主区：选择5把材料枪 + 输入各自磨损 ==========
+    st.subheader("🧪 选择 5 把材料枪 + 自填磨损 → 计算合成刀磨损（线性模型）")
+    st.caption("说明：下面 5 行可以任意组合这 4 把枪，也可以重复；勾了上面的伽玛多普勒模式就按 FN / MW 区间算。")
+
+    mat_sel = []
+    for i in range(5):
+        c1, c2, c3 = st.columns([1.4, 1.0, 1.8])
+        with c1:
+            name = st.selectbox(
+                f"第 {i+1} 把材料枪类型",
+                list(WEAR_RANGE.keys()),
+                key=f"night_mat_pick_{i}"
+            )
+        m_min, m_max = WEAR_RANGE[name]
+        with c2:
+            wear = st.number_input(
+                f"磨损 {i+1}",
+                min_value=float(m_min),
+                max_value=float(m_max),
+                value=float(m_min),
+                step=0.0001,
+                format="%.6f",
+                key=f"night_mat_wear_{i}"
             )
-            st.caption("建议再多留 0.001~0.003 安全余量。")
+        with c3:
+            st.caption(f"允许磨损区间：[{m_min:.2f} ~ {m_max:.2f}]（当前选择：{name}）")
+        mat_sel.append((name, wear))
+
+    if st.button("计算合成刀磨损", key="night_btn_calc_forward"):
+        engine = GAMMA_ENGINE if gamma_mode else ENGINE
+        out_tiers = GAMMA_TIER if gamma_mode else KNIFE_TIER
+
+        names = [n for n, _ in mat_sel]
+        res = engine.evaluate(engine.material_index([names]), [[w for _, w in mat_sel]])
+        bad = [n for n, k in zip(names, res.mapped[0]) if np.isnan(k)]
+        if bad:
+            st.error(f"无法映射：{bad[0]}，请检查配置 WEAR_RANGE")
+            mapped = []
+        else:
+            mapped = [
+                {"材料枪": n, "材料磨损": w, "映射到刀磨损": float(k)}
+                for (n, w), k in zip(mat_sel, res.mapped[0])
+            ]
+
+        if mapped:
+            k_vals = [x["映射到刀磨损"] for x in mapped]
+            k_avg = float(res.avg[0])
+            tier = engine.tier_name(res.tier[0])
+
+            st.markdown("**单把映射明细：**")
+            st.dataframe(mapped, use_container_width=True)
+
+            st.success(f"➡️ 计算得到的 **刀磨损**：**{k_avg:.6f}**")
+            if tier:
+                st.info(
+                    f"预计成色：**{tier}**  （区间："
+                    f"{out_tiers[tier][0]:.2f} ~ {out_tiers[tier][1]:.2f}）"
+                )
+            else:
+                st.warning("未能匹配到刀成色区间（可能数值越界或配置问题）")
+
+            # 可视化
+            fig_fw, ax_fw = plt.subplots(figsize=(8, 2.8))
+            xs = range(1, 6)
+            ax_fw.bar(xs, k_vals)
+            ax_fw.axhline(k_avg, linestyle="--")
+            ax_fw.set_xticks(xs)
+            ax_fw.set_xticklabels([f"{i}" for i in xs])
+            ax_fw.set_ylabel("映射到刀磨损")
+            ax_fw.set_title("5 把材料映射到刀磨损（越低越好）")
+            for idx, v in enumerate(k_vals, start=1):
+                ax_fw.text(idx, v, f"{v:.3f}", ha="center", va="bottom", fontsize=9)
+            ax_fw.text(5.8, k_avg, f"平均：{k_avg:.3f}", ha="right", va="bottom")
+            st.pyplot(fig_fw)
+
+    # ================== 主区：期望收益 ==================
+    # 价格库没更新时 sync 直接跳过，面板只是查表
+    EV_STATS.sync(knives, TIER_EN_MAP, price_of)
+    fw_engine = GAMMA_ENGINE if gamma_mode else ENGINE
+    fw_res = fw_engine.evaluate(
+        fw_engine.material_index([[n for n, _ in mat_sel]]),
+        [[w for _, w in mat_sel]],
+    )
+    mat_cost, missing = material_cost(mat_sel, weapons)
+    ev_engine.render_ev(
+        EV_STATS,
+        fw_engine.tier_names,
+        mat_cost,
+        fw_engine.tier_name(fw_res.tier[0]),
+        product="刀",
+        missing=missing,
+    )
+
+    # ================== 主区：蒙特卡洛模拟 ==================
+    monte_carlo.render_simulator(
+        EV_STATS.prices(fw_engine.tier_name(fw_res.tier[0])),
+        mat_cost,
+        key_prefix="night",
+        product="刀",
+        missing=missing,
+    )
+
+    # ================== 主区：敏感性扫描 ==================
+    sensitivity.render_sensitivity(
+        EV_STATS.items(fw_engine.tier_name(fw_res.tier[0])),
+        [(n, material_cost([(n, w)], weapons)[0]) for n, w in mat_sel],
+        key_prefix="night",
+        product="刀",
+    )
+
+    # ================== 主区：材料磨损热力图 ==================
+    float_heatmap.render_float_heatmap(float_grid(), ENGINE, product="刀")
+
+    # ================== 主区：批量导入材料 ==================
+    inventory_import.render_import(GAMMA_ENGINE if gamma_mode else ENGINE, key_prefix="night", product="刀")
+
+    # ================== 主区：目标成色最便宜的合同 ==================
+    contract_planner.render_planner(GAMMA_ENGINE if gamma_mode else ENGINE, key_prefix="night", product="刀")
+
+    # ================== 主区：库存批量拆合同 ==================
+    inventory_partition.render_partitioner(
+        GAMMA_ENGINE if gamma_mode else ENGINE,
+        tier_prices(knives),
+        key_prefix="night",
+        product="刀",
+    )
 
     # ================== 主区：刀价格图表 ==================
     st.subheader(f"📊 刀价格展示图（当前档位：{knife_tier_choice}）")
 
     k_names = [k["name"] for k in knives]
-    k_prices = [k["min_price"] for k in knives]
+    k_prices = [price_of(k, knife_tier_choice) for k in knives]
     avg_knife_price = sum(k_prices) / len(k_prices) if k_prices else 0
 
     fig, ax = plt.subplots(figsize=(10, 4))
@@ -480,10 +803,10 @@ def render():
     st.pyplot(fig)
 
     # ================== 主区：枪价格图表 ==================
-    st.subheader("📊 炼金红皮价格展示图")
+    st.subheader(f"📊 炼金红皮价格展示图（当前档位：{weapon_tier_choice}）")
 
     w_names = [w["name"] for w in weapons]
-    w_prices = [w["min_price"] for w in weapons]
+    w_prices = [price_of(w, weapon_tier_choice) for w in weapons]
     avg_knife_div_5 = avg_knife_price / 5 if avg_knife_price else 0
 
     combined = list(zip(w_names, w_prices))
@@ -518,14 +841,23 @@ def render():
     # ================== 主区：表格 ==================
     st.subheader("🔪 刀价格表")
     st.dataframe(
-        [{"刀": k["name"], "最低价": k["min_price"]} for k in knives],
+        [{"刀": k["name"], **{t: price_of(k, t) for t in TIER_EN_MAP}} for k in knives],
         use_container_width=True,
     )
 
     st.subheader("🔫 炼金红皮价格表")
     st.dataframe(
-        [{"枪": w["name"], "最低价": w["min_price"]} for w in weapons],
+        [{"枪": w["name"], **{t: price_of(w, t) for t in TIER_EN_MAP}} for w in weapons],
         use_container_width=True,
     )
 
+    # ================== 主区：历史价格走势 ==================
+    history_chart.render_history(
+        CASE_KEY,
+        [k["name"] for k in knives] + [w["name"] for w in weapons],
+        list(TIER_EN_MAP),
+        key_prefix="night",
+        tier_of=_price_tier,
+    )
+
 
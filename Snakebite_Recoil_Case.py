@@ -1,10 +1,24 @@
-import json
 import streamlit as st
-import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import price_client
+import price_refresher
+import price_status
+import price_store
+import price_snapshot
+import history_chart
+import tradeup_engine
+import contract_planner
+import inventory_partition
+import inventory_import
+import ev_engine
+import monte_carlo
+import inverse_table
+import recipe_scan
+import sensitivity
+import float_heatmap
 from pathlib import Path
 from matplotlib import font_manager
 import matplotlib.pyplot as plt
+import numpy as np
 import os
 
 # ================== 字体 ==================
@@ -33,7 +47,8 @@ plt.rcParams["axes.unicode_minus"] = False
 
 # ================== 基础配置 ==================
 API_KEY = st.secrets["API_KEY"]
-PRICE_URL = "https://open.steamdt.com/open/cs2/v1/price/single"
+CASE_KEY = "snake"
+# 老的 JSON 数据文件：第一次启动时导入价格库
 DATA_FILE = Path("gloves.json")
 
 # ================== 名称映射（手套 + 四把枪） ==================
@@ -72,7 +87,8 @@ STEAMDT_NAME_MAP = {
 }
 
 # ================== 默认数据 ==================
-DEFAULT_GLOVES = [
+# 只读（price_snapshot.freeze），所有会话共用也不会被谁改掉
+DEFAULT_GLOVES = price_snapshot.freeze([
     {"name": "裹手 | 沙漠头巾", "min_price": 354},
     {"name": "裹手 | 长颈鹿", "min_price": 372.5},
     {"name": "裹手 | 蟒蛇", "min_price": 391.5},
@@ -97,14 +113,14 @@ DEFAULT_GLOVES = [
     {"name": "运动手套 | 弹弓", "min_price": 3809},
     {"name": "驾驶手套 | 雪豹", "min_price": 2219},
     {"name": "运动手套 | 夜行衣", "min_price": 4744},
-]
+])
 
-DEFAULT_WEAPONS = [
+DEFAULT_WEAPONS = price_snapshot.freeze([
     {"name": "M4A4 | 活色生香", "min_price": 0},
     {"name": "USP 消音版 | 印花集", "min_price": 0},
     {"name": "USP 消音版 | 倒吊人", "min_price": 0},
     {"name": "AWP | 迷人眼", "min_price": 0},
-]
+])
 
 # ================== 材料枪磨损区间 ==================
 WEAR_RANGE = {
@@ -126,91 +142,181 @@ GLOVE_TIER = {
     "战痕累累 (BS)": (0.45, 0.80),
 }
 
-# ========== 工具函数：材料磨损 -> 手套磨损 ==========
-def mat_float_to_glove_float(material_name: str, mat_float: float):
-    if material_name not in WEAR_RANGE:
-        return None
-    m_min, m_max = WEAR_RANGE[material_name]
-    if m_max <= m_min:
-        return None
-    mf = max(m_min, min(m_max, mat_float))
-    pos = (mf - m_min) / (m_max - m_min)
-    glove_f = GLOVE_MIN + pos * (GLOVE_MAX - GLOVE_MIN)
-    glove_f = max(GLOVE_MIN, min(GLOVE_MAX, glove_f))
-    return round(glove_f, 6)
+# 向量化计算：一次算很多组 5 把材料的手套磨损 / 成色，计算器和批量分析都用它
+ENGINE = tradeup_engine.TradeUpEngine(WEAR_RANGE, GLOVE_MIN, GLOVE_MAX, GLOVE_TIER)
 
+# 手套池的价格统计（增量维护，只有久经沙场有价），期望收益面板用
+EV_STATS = ev_engine.OutcomeStats()
 
-def classify_glove_tier(glove_float: float):
-    for tier_name, (lo, hi) in GLOVE_TIER.items():
-        if lo <= glove_float <= hi:
-            return tier_name
-    return None
+# ================== 价格库读写 ==================
+# 手套页只拉久经沙场（STEAMDT_NAME_MAP 里已经写死 Field-Tested）
+PRICE_TIER = "久经沙场 (FT)"
 
+# 材料枪久经沙场的磨损区间（枪的通用分档，不是手套的 GLOVE_TIER），拉到的枪价只对这段磨损的材料有效
+MATERIAL_PRICE_BAND = (0.15, 0.38)
 
-def calc_max_material_float_for_glove_tier(material_name: str, target_glove_max: float):
+
+def _legacy_rows(data, file_mtime: float):
+    """老 JSON 数据文件 -> 价格库的行（只在第一次导入时用）"""
+    if isinstance(data, list):
+        items = data
+    else:
+        items = data.get("gloves", []) + data.get("weapons", [])
+
+    rows = []
+    for i in items:
+        if i.get("min_price"):
+            rows.append((
+                i["name"],
+                PRICE_TIER,
+                float(i["min_price"]),
+                i.get("fetched_at") or file_mtime,
+                i.get("volatility", 0.0),
+            ))
+    return rows
+
+
+def _items_from_rows(defaults, rows):
+    items = []
+    for d in defaults:
+        item = dict(d)
+        row = rows.get((d["name"], PRICE_TIER))
+        if row:
+            item["min_price"], item["fetched_at"], item["volatility"] = row
+        items.append(price_snapshot.freeze(item))
+    return tuple(items)
+
+
+def _build_table(rows):
+    return _items_from_rows(DEFAULT_GLOVES, rows), _items_from_rows(DEFAULT_WEAPONS, rows)
+
+
+def load_data():
     """
-    给定：材料枪 + 想要的手套成色的上限
-    返回：这把材料枪最高能用多少磨损
+    本页手套 / 枪列表：进程内所有会话共享一份，价格库版本变了才重建
+    返回值是只读快照，要改用 price_snapshot.evolve 写时复制
     """
-    if material_name not in WEAR_RANGE:
-        return None
+    return price_store.cached_table(CASE_KEY, _build_table)
 
-    mat_min, mat_max = WEAR_RANGE[material_name]
-    ratio = (target_glove_max - GLOVE_MIN) / (GLOVE_MAX - GLOVE_MIN)
-    if ratio < 0:
-        return None
 
-    mat_float = mat_min + ratio * (mat_max - mat_min)
-    return min(mat_float, mat_max)
+def _hash_index():
+    """marketHashName -> [物品名]，拉到新价格时用来定位要写的行"""
+    index = {}
+    for name, mh in STEAMDT_NAME_MAP.items():
+        index.setdefault(mh, []).append(name)
+    return index
 
-# ================== 文件读写 ==================
-def load_data():
-    if not DATA_FILE.exists():
-        return DEFAULT_GLOVES, DEFAULT_WEAPONS
-    with DATA_FILE.open("r", encoding="utf-8") as f:
-        data = json.load(f)
-    if isinstance(data, list):
-        return data, DEFAULT_WEAPONS
-    return data.get("gloves", DEFAULT_GLOVES), data.get("weapons", DEFAULT_WEAPONS)
+
+HASH_INDEX = _hash_index()
 
 
-def save_data(gloves, weapons):
-    with DATA_FILE.open("w", encoding="utf-8") as f:
-        json.dump({"gloves": gloves, "weapons": weapons}, f, ensure_ascii=False, indent=2)
+def _on_new_price(market_hash, latest):
+    # 拉到新价格就点更新对应的行，不再整份重写
+    names = HASH_INDEX.get(market_hash)
+    if names:
+        price_store.upsert_prices(CASE_KEY, [
+            (name, PRICE_TIER, latest.price, latest.fetched_at, latest.volatility)
+            for name in names
+        ])
 
 # ================== 拉价 ==================
 def fetch_lowest_price(market_hash):
-    try:
-        r = requests.get(
-            PRICE_URL,
-            headers={"Authorization": f"Bearer {API_KEY}"},
-            params={"marketHashName": market_hash},
-            timeout=10,
-        )
-        data = r.json()
-        if not data.get("success"):
+    return price_client.fetch_lowest_price(market_hash, API_KEY)
+
+
+def refresh_hashes():
+    """后台刷新用：本页所有手套 / 枪的 marketHashName"""
+    return list(HASH_INDEX)
+
+
+def fetched_times(items):
+    """本页每个价格的拉取时间（没拉过的是 None）"""
+    return [i.get("fetched_at") for i in items]
+
+
+def tier_prices(items):
+    """成品均价：手套只拉了久经沙场（PRICE_TIER）的价，其余档位没有价格"""
+    prices = [i["min_price"] for i in items if i.get("min_price")]
+    return {PRICE_TIER: sum(prices) / len(prices) if prices else None}
+
+
+def material_cost(mat_sel, weapons):
+    """
+    5 把材料的总价，返回 (总价, 没价格的材料名)
+    枪只拉了久经沙场的价，磨损不在 MATERIAL_PRICE_BAND（夹到材料区间）里的材料算没价格，不拿久经沙场的价顶替
+    """
+    by_name = {w["name"]: w for w in weapons}
+    cost, missing = 0.0, []
+    for name, wear in mat_sel:
+        lo, hi = MATERIAL_PRICE_BAND
+        m_min, m_max = WEAR_RANGE.get(name, (lo, hi))
+        priced = max(lo, m_min) <= wear <= min(hi, m_max)
+        p = by_name[name].get("min_price") if name in by_name and priced else 0
+        if not p:
+            missing.append(name)
+        cost += p or 0
+    return cost, missing
+
+
+def scan_recipes():
+    """
+    首页配方扫描用：只读缓存价格，不拉价
+    枪只拉了久经沙场的价，反推出的最高磨损够得着材料的久经沙场区间才算得出材料价
+    返回 (配方列表, 本页价格的拉取时间)
+    """
+    gloves, weapons = load_data()
+    EV_STATS.sync(gloves, [PRICE_TIER], lambda g, tier: g.get("min_price"))
+    by_name = {w["name"]: w for w in weapons}
+
+    def unit_cost(material, max_float):
+        lo, hi = MATERIAL_PRICE_BAND
+        m_min, m_max = WEAR_RANGE[material]
+        if max_float < max(lo, m_min) or m_max <= lo or m_min >= hi:
             return None
-        prices = [p.get("sellPrice") for p in data.get("data", []) if p.get("sellPrice")]
-        return min(prices) if prices else None
-    except Exception:
-        return None
-
-
-def update_all(items):
-    updated = 0
-    with ThreadPoolExecutor(max_workers=8) as ex:
-        futs = {
-            ex.submit(fetch_lowest_price, STEAMDT_NAME_MAP.get(i["name"])): i
-            for i in items
-            if i["name"] in STEAMDT_NAME_MAP
-        }
-        for fut in as_completed(futs):
-            item = futs[fut]
-            p = fut.result()
-            if p:
-                item["min_price"] = float(p)
-                updated += 1
-    return updated
+        return by_name[material].get("min_price")
+
+    return recipe_scan.scan(ENGINE, EV_STATS, unit_cost), fetched_times(gloves + weapons)
+
+
+def float_grid():
+    """
+    材料磨损 × 期望利润网格，同一份价格快照只算一次
+    枪只拉了久经沙场的价，只有落在 MATERIAL_PRICE_BAND（夹到材料区间）里的磨损有材料价，
+    其余磨损是 NaN（热力图上是灰的），不拿久经沙场的价冒充更低磨损的材料
+    """
+    table = load_data()
+
+    def build():
+        gloves, weapons = table
+        by_name = {w["name"]: w for w in weapons}
+        prices = np.array([by_name[m].get("min_price") or np.nan for m in ENGINE.materials])[:, None]
+        lo = np.maximum(MATERIAL_PRICE_BAND[0], ENGINE.mat_min)[:, None]
+        hi = np.minimum(MATERIAL_PRICE_BAND[1], ENGINE.mat_max)[:, None]
+        return float_heatmap.profit_grid(
+            ENGINE,
+            tier_prices(gloves),
+            lambda grid: np.where((grid >= lo) & (grid <= hi), prices, np.nan),
+        )
+
+    return float_heatmap.cached_grid(CASE_KEY, table, build)
+
+
+def seed_from_store():
+    """把价格库里带时间戳的价格灌进进程快照，后台增量刷新就知道哪些还新"""
+    for items in load_data():
+        for i in items:
+            price_client.seed_latest(
+                STEAMDT_NAME_MAP.get(i["name"]),
+                i.get("min_price"),
+                i.get("fetched_at"),
+                i.get("volatility", 0.0),
+            )
+
+
+price_store.import_legacy_json(CASE_KEY, DATA_FILE, _legacy_rows)
+seed_from_store()
+price_client.add_listener(_on_new_price)
+price_refresher.register(CASE_KEY, refresh_hashes, API_KEY)
 
 # ================== 页面渲染函数 ==================
 def render():
@@ -218,17 +324,12 @@ def render():
     🐍 蛇噬/反冲 手套炼金 页面
     在 main.py 中：import page_serpentine; page_serpentine.render()
     """
-    # 1. 初始化本页面自己的状态
-    if "snake_gloves" not in st.session_state or "snake_weapons" not in st.session_state:
-        g, w = load_data()
-        st.session_state.snake_gloves = g
-        st.session_state.snake_weapons = w
-
-    gloves = st.session_state.snake_gloves
-    weapons = st.session_state.snake_weapons
+    # 1. 本页价格表：进程内共享的只读快照，价格库有更新才重建，会话里不再各存一份
+    gloves, weapons = load_data()
 
     # 2. 页面标题
     st.title("🎮 CS2 蛇噬/反冲炼金收益展示")
+    freshness_box = st.container()
 
     # ================== Sidebar：手套 ==================
     st.sidebar.subheader("🧤 手套操作")
@@ -249,7 +350,9 @@ def render():
         if en:
             p = fetch_lowest_price(en)
             if p:
-                cur_glove["min_price"] = float(p)
+                # 新价格已写进价格库，重新读一次共享价格表
+                gloves, weapons = load_data()
+                cur_glove = next(g for g in gloves if g["name"] == sel_glove)
                 st.sidebar.success(f"✅ 手套已更新：{p}")
             else:
                 st.sidebar.error("❌ 手套没拉到价格")
@@ -257,9 +360,8 @@ def render():
             st.sidebar.error("❌ 没配置映射")
 
     if btn_g2:
-        with st.spinner("⚙️ 正在刷新所有手套..."):
-            n = update_all(gloves)
-        st.sidebar.success(f"✅ 已刷新 {n} 只手套")
+        price_refresher.request_refresh(CASE_KEY)
+        st.sidebar.info("⏳ 已提交后台刷新，完成后页面会自动更新")
 
     st.sidebar.markdown(f"当前手套价：**{cur_glove['min_price']:.2f}** 元")
 
@@ -283,7 +385,8 @@ def render():
         if en:
             p = fetch_lowest_price(en)
             if p:
-                cur_weapon["min_price"] = float(p)
+                gloves, weapons = load_data()
+                cur_weapon = next(w for w in weapons if w["name"] == sel_weapon)
                 st.sidebar.success("✅ 当前这把枪已更新")
             else:
                 st.sidebar.error("❌ 枪没拉到价格")
@@ -291,14 +394,14 @@ def render():
             st.sidebar.error("❌ 这把枪没配置映射")
 
     if btn_w2:
-        with st.spinner("⚙️ 正在刷新所有枪..."):
-            n = update_all(weapons)
-        st.sidebar.success(f"✅ 已刷新 {n} 把枪")
+        price_refresher.request_refresh(CASE_KEY)
+        st.sidebar.info("⏳ 已提交后台刷新，完成后页面会自动更新")
 
     st.sidebar.markdown(f"当前枪价：**{cur_weapon['min_price']:.2f}** 元")
 
-    # 保存到文件
-    save_data(gloves, weapons)
+    # 价格新鲜度：旧了就后台重新拉，不阻塞本次渲染
+    with freshness_box:
+        price_status.render_freshness(CASE_KEY, fetched_times(gloves + weapons))
 
     # ================== 主区：反推材料最大磨损 ==================
     st.subheader("🧮 想要这种手套外观，我的材料枪最多能用多少磨损？")
@@ -317,18 +420,18 @@ def render():
             key="snake_sel_tier"
         )
 
-    tier_min, tier_max = GLOVE_TIER[sel_tier]
+    # 反推表在启动时就算好了，选完直接查
+    res = ENGINE.max_material_float(sel_mat, sel_tier)
+    if res is None:
+        st.error("无法计算，请检查区间。")
+    else:
+        st.success(
+            f"要合出 **{sel_tier}** 的手套，"
+            f"{sel_mat} 的磨损应 ≤ **{res:.6f}**"
+        )
+        st.caption("建议再多留 0.001~0.003 安全余量。")
 
-    if st.button("计算最大可用材料磨损", key="snake_btn_calc_inverse"):
-        res = calc_max_material_float_for_glove_tier(sel_mat, tier_max)
-        if res is None:
-            st.error("无法计算，请检查区间。")
-        else:
-            st.success(
-                f"要合出 **{sel_tier}** 的手套，"
-                f"{sel_mat} 的磨损应 ≤ **{res:.6f}**"
-            )
-            st.caption("建议再多留 0.001~0.003 安全余量。")
+    inverse_table.render_inverse_table({"手套": ENGINE}, key_prefix="snake")
 
     # ========== 主区：选择5把材料枪 + 输入各自磨损 ==========
     st.subheader("🧪 选择 5 把材料枪 + 自填磨损 → 计算合成手套磨损（线性模型）")
@@ -359,19 +462,22 @@ def render():
         mat_sel.append((name, wear))
 
     if st.button("计算合成手套磨损", key="snake_btn_calc_forward"):
-        mapped = []
-        for (n, w) in mat_sel:
-            g_val = mat_float_to_glove_float(n, w)
-            if g_val is None:
-                st.error(f"无法映射：{n}，请检查配置 WEAR_RANGE")
-                mapped = []
-                break
-            mapped.append({"材料枪": n, "材料磨损": w, "映射到手套磨损": g_val})
+        names = [n for n, _ in mat_sel]
+        res = ENGINE.evaluate(ENGINE.material_index([names]), [[w for _, w in mat_sel]])
+        bad = [n for n, g in zip(names, res.mapped[0]) if np.isnan(g)]
+        if bad:
+            st.error(f"无法映射：{bad[0]}，请检查配置 WEAR_RANGE")
+            mapped = []
+        else:
+            mapped = [
+                {"材料枪": n, "材料磨损": w, "映射到手套磨损": float(g)}
+                for (n, w), g in zip(mat_sel, res.mapped[0])
+            ]
 
         if mapped:
             g_vals = [x["映射到手套磨损"] for x in mapped]
-            g_avg = sum(g_vals) / len(g_vals)
-            tier = classify_glove_tier(g_avg)
+            g_avg = float(res.avg[0])
+            tier = ENGINE.tier_name(res.tier[0])
 
             st.markdown("**单把映射明细：**")
             st.dataframe(mapped, use_container_width=True)
@@ -399,6 +505,57 @@ def render():
             ax_fw.text(5.8, g_avg, f"平均：{g_avg:.3f}", ha="right", va="bottom")
             st.pyplot(fig_fw)
 
+    # ================== 主区：期望收益 ==================
+    # 价格库没更新时 sync 直接跳过，面板只是查表
+    EV_STATS.sync(gloves, [PRICE_TIER], lambda g, tier: g.get("min_price"))
+    fw_res = ENGINE.evaluate(
+        ENGINE.material_index([[n for n, _ in mat_sel]]),
+        [[w for _, w in mat_sel]],
+    )
+    mat_cost, missing = material_cost(mat_sel, weapons)
+    ev_engine.render_ev(
+        EV_STATS,
+        ENGINE.tier_names,
+        mat_cost,
+        ENGINE.tier_name(fw_res.tier[0]),
+        product="手套",
+        missing=missing,
+    )
+
+    # ================== 主区：蒙特卡洛模拟 ==================
+    monte_carlo.render_simulator(
+        EV_STATS.prices(ENGINE.tier_name(fw_res.tier[0])),
+        mat_cost,
+        key_prefix="snake",
+        product="手套",
+        missing=missing,
+    )
+
+    # ================== 主区：敏感性扫描 ==================
+    sensitivity.render_sensitivity(
+        EV_STATS.items(ENGINE.tier_name(fw_res.tier[0])),
+        [(n, material_cost([(n, w)], weapons)[0]) for n, w in mat_sel],
+        key_prefix="snake",
+        product="手套",
+    )
+
+    # ================== 主区：材料磨损热力图 ==================
+    float_heatmap.render_float_heatmap(float_grid(), ENGINE, product="手套")
+
+    # ================== 主区：批量导入材料 ==================
+    inventory_import.render_import(ENGINE, key_prefix="snake", product="手套")
+
+    # ================== 主区：目标成色最便宜的合同 ==================
+    contract_planner.render_planner(ENGINE, key_prefix="snake", product="手套")
+
+    # ================== 主区：库存批量拆合同 ==================
+    inventory_partition.render_partitioner(
+        ENGINE,
+        tier_prices(gloves),
+        key_prefix="snake",
+        product="手套",
+    )
+
     # ================== 主区：手套价格图表 ==================
     st.subheader("📊 手套价格展示图(久经沙场)")
 
@@ -482,3 +639,11 @@ def render():
         use_container_width=True,
     )
 
+    # ================== 主区：历史价格走势 ==================
+    history_chart.render_history(
+        CASE_KEY,
+        [g["name"] for g in gloves] + [w["name"] for w in weapons],
+        [PRICE_TIER],
+        key_prefix="snake",
+    )
+
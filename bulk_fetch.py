@@ -0,0 +1,43 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import price_client
+
+# 所有页面共用的拉价线程池，大小和连接池一样都是 price_client.MAX_WORKERS
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=price_client.MAX_WORKERS,
+    thread_name_prefix="price-fetch",
+)
+
+
+async def _fetch_all(hashes, api_key, on_result):
+    loop = asyncio.get_running_loop()
+    sem = asyncio.Semaphore(price_client.MAX_WORKERS)
+
+    async def fetch_one(mh):
+        async with sem:
+            p = await loop.run_in_executor(_EXECUTOR, price_client.fetch_lowest_price, mh, api_key)
+        return mh, p
+
+    results = {}
+    for coro in asyncio.as_completed([fetch_one(mh) for mh in hashes]):
+        mh, p = await coro
+        results[mh] = p
+        if on_result is not None:
+            on_result(mh, p)
+    return results
+
+
+def fetch_many(hashes, api_key, on_result=None):
+    """
+    批量拉价（asyncio 调度）：
+    - hashes: marketHashName 列表，重复的只拉一次
+    - 同时在途的请求上限就是线程池大小 price_client.MAX_WORKERS
+    - on_result(mh, price): 每拉完一个就回调一次（在调用线程里执行）
+    - 限速由 price_client 的令牌桶统一控制，缓存命中不消耗令牌
+    返回 {marketHashName: price or None}
+    """
+    unique = list(dict.fromkeys(h for h in hashes if h))
+    if not unique:
+        return {}
+    return asyncio.run(_fetch_all(unique, api_key, on_result))
@@ -0,0 +1,165 @@
+"""
+最便宜合同规划的暴力对拍：python check_contract_planner.py
+- 随机小挂单池：cheapest_contract 的总价要和枚举所有 5 条组合的最低价完全一样
+- 档位上限附近挤在同一格、最便宜的那组恰好凑不上的情况（以前会返回 None）
+- 便宜挂单贴在档位上限外面、贵的贴在里面：小池子和暴力比，200 条时至少不比里面最便宜的 5 把贵
+- 几万条“磨损越高越便宜、跨档位跳价”的挂单：每个档位都要给出凑得出的方案（搜不完也要有保底方案）
+不依赖 streamlit 页面，引擎直接按手套页面的分档构造
+"""
+import itertools
+import sys
+import time
+
+import numpy as np
+
+from contract_planner import CONTRACT_SIZE, cheapest_contract
+from tradeup_engine import TradeUpEngine
+
+OUT_MIN, OUT_MAX = 0.06, 0.80
+TIERS = {
+    "崭新出厂 (FN)": (0.06, 0.07),
+    "略有磨损 (MW)": (0.07, 0.15),
+    "久经沙场 (FT)": (0.15, 0.38),
+    "破损不堪 (WW)": (0.38, 0.45),
+    "战痕累累 (BS)": (0.45, 0.80),
+}
+# 材料区间和成品区间一样时，材料磨损映射过去不变，方便直接写成品磨损
+WEAR_RANGE = {
+    "原样": (OUT_MIN, OUT_MAX),
+    "全区间": (0.0, 1.0),
+    "窄区间": (0.0, 0.45),
+}
+
+
+def brute_force(engine, tier, names, floats, prices):
+    tier_idx = engine.tier_names.index(tier)
+    idx = engine.material_index(names)
+    combos = np.array(list(itertools.combinations(range(len(names)), CONTRACT_SIZE)))
+    res = engine.evaluate(idx[combos], np.asarray(floats)[combos])
+    hit = res.tier == tier_idx
+    if not hit.any():
+        return None
+    return float(np.asarray(prices)[combos[hit]].sum(axis=1).min())
+
+
+def check_boundary_repro(engine):
+    floats = [0.379985, 0.379598, 0.379949, 0.380066, 0.380167, 0.38061]
+    prices = [1, 81, 34, 43, 18, 19]
+    plan = cheapest_contract(engine, "久经沙场 (FT)", ["原样"] * len(floats), floats, prices)
+    expected = brute_force(engine, "久经沙场 (FT)", ["原样"] * len(floats), floats, prices)
+    ok = plan is not None and abs(plan.cost - expected) < 1e-9
+    print(f"档位边界复现：期望 {expected}，得到 {plan.cost if plan else None} -> {'OK' if ok else 'FAIL'}")
+    return ok
+
+
+def check_random(engine, rounds=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    checked = feasible = bad = 0
+    for _ in range(rounds):
+        m = int(rng.integers(CONTRACT_SIZE, 13))
+        names = rng.choice(list(WEAR_RANGE), m).tolist()
+        tier = rng.choice(engine.tier_names)
+        lo, hi = TIERS[tier]
+        # 大部分挂单贴着档位上限（离散后挤在边界那几格，最容易出错），其余随便
+        near = rng.random(m) < 0.8
+        floats = np.where(near, hi + rng.normal(0, 0.0005, m), rng.uniform(0, 1, m))
+        floats = np.clip(floats, 0, 1)
+        floats = np.array([
+            WEAR_RANGE[n][0] + (f - OUT_MIN) / (OUT_MAX - OUT_MIN) * (WEAR_RANGE[n][1] - WEAR_RANGE[n][0]) if nr else f
+            for n, f, nr in zip(names, floats, near)
+        ])
+        prices = rng.integers(1, 100, m).astype(float)
+
+        expected = brute_force(engine, tier, names, floats, prices)
+        plan = cheapest_contract(engine, tier, names, floats, prices)
+        got = plan.cost if plan else None
+        checked += 1
+        feasible += expected is not None
+        if (expected is None) != (got is None) or (expected is not None and abs(expected - got) > 1e-9):
+            bad += 1
+            print(f"不一致：{tier} {names} {floats.tolist()} {prices.tolist()} 期望 {expected} 得到 {got}")
+    print(f"随机对拍：{checked} 组（{feasible} 组凑得出），不一致 {bad} 组")
+    return bad == 0
+
+
+def _valid(engine, tier, names, floats, plan):
+    idx = engine.material_index([names[i] for i in plan.picks])
+    res = engine.evaluate(idx[None, :], np.asarray(floats)[plan.picks][None, :])
+    return len(plan.picks) == CONTRACT_SIZE and res.tier[0] == engine.tier_names.index(tier)
+
+
+def _ceiling_pool(m, seed, width):
+    # 一半便宜的挂单贴在久经沙场上限外面，一半贵的贴在里面
+    rng = np.random.default_rng(seed)
+    hi = TIERS["久经沙场 (FT)"][1]
+    floats = np.r_[hi + rng.uniform(1e-6, width, m // 2), hi - rng.uniform(1e-6, width, m // 2)]
+    prices = np.r_[rng.uniform(10, 20, m // 2), rng.uniform(50, 60, m // 2)]
+    return ["原样"] * m, floats, prices
+
+
+def check_ceiling(engine, rounds=40):
+    tier = "久经沙场 (FT)"
+    bad = 0
+    for seed in range(rounds):
+        names, floats, prices = _ceiling_pool(40, seed, 2e-3)
+        expected = brute_force(engine, tier, names, floats, prices)
+        plan = cheapest_contract(engine, tier, names, floats, prices)
+        if plan is None or not plan.picks or not _valid(engine, tier, names, floats, plan):
+            bad += 1
+        elif plan.cost < expected - 1e-9 or (plan.optimal and plan.cost > expected + 1e-9):
+            bad += 1
+    print(f"上限内外挤着的小池子：{rounds} 组，不一致 {bad} 组")
+
+    names, floats, prices = _ceiling_pool(200, 3, 2e-4)
+    below = float(np.sort(prices[100:])[:CONTRACT_SIZE].sum())
+    plan = cheapest_contract(engine, tier, names, floats, prices)
+    ok = plan is not None and bool(plan.picks) and _valid(engine, tier, names, floats, plan) and plan.cost <= below + 1e-9
+    print(
+        f"上限内外挤着的 200 条：得到 {plan.cost if plan else None}（{'最低' if plan and plan.optimal else '保底'}），"
+        f"里面最便宜 5 把 {below:.2f} -> {'OK' if ok else 'FAIL'}"
+    )
+    return bad == 0 and ok
+
+
+def check_market(engine, m=50_000, seed=2):
+    # 磨损越高越便宜，跨档位往下跳价；每个档位里都有几千条挂单，不应该出现“凑不出”
+    rng = np.random.default_rng(seed)
+    floats = rng.uniform(OUT_MIN, OUT_MAX, m)
+    base = dict(zip(TIERS, (400, 200, 100, 60, 40)))
+    prices = np.empty(m)
+    for tier, (lo, hi) in TIERS.items():
+        sel = (floats >= lo) & (floats <= hi)
+        prices[sel] = base[tier] * (1 + 0.5 * (hi - floats[sel]) / (hi - lo)) + rng.uniform(0, 1, sel.sum())
+    names = ["原样"] * m
+
+    ok = True
+    for tier in TIERS:
+        t = time.perf_counter()
+        plan = cheapest_contract(engine, tier, names, floats, prices)
+        good = plan is not None and bool(plan.picks) and _valid(engine, tier, names, floats, plan)
+        ok = ok and good
+        print(
+            f"{m} 条行情挂单 {tier}：{time.perf_counter() - t:.2f} 秒，总价 {plan.cost if plan else None}"
+            f"（{'最低' if plan and plan.optimal else '保底'}） -> {'OK' if good else 'FAIL'}"
+        )
+    return ok
+
+
+def check_speed(engine, m=50_000, seed=1):
+    rng = np.random.default_rng(seed)
+    names = rng.choice(list(WEAR_RANGE), m).tolist()
+    floats = rng.uniform(0, 1, m)
+    prices = rng.uniform(1, 100, m)
+    t = time.perf_counter()
+    plan = cheapest_contract(engine, "久经沙场 (FT)", names, floats, prices)
+    print(f"{m} 条挂单：{time.perf_counter() - t:.3f} 秒，总价 {plan.cost if plan else None}")
+
+
+if __name__ == "__main__":
+    engine = TradeUpEngine(WEAR_RANGE, OUT_MIN, OUT_MAX, TIERS)
+    ok = check_boundary_repro(engine)
+    ok = check_random(engine) and ok
+    ok = check_ceiling(engine) and ok
+    ok = check_market(engine) and ok
+    check_speed(engine)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,269 @@
+import heapq
+import itertools
+from collections import namedtuple
+
+import numpy as np
+import streamlit as st
+
+# 一份合同的材料数
+CONTRACT_SIZE = 5
+
+# 离散精度：5 把材料的磨损总和切成多少格（越大越准，也越慢）
+SUM_RESOLUTION = 1000
+
+# 精确校验时最多展开多少个搜索状态（大量挂单挤在档位边界、又都凑不上时，搜到这里就停，返回手里最便宜的可行方案）
+MAX_EXPANSIONS = 20_000
+
+# 磨损总和比较时的容差
+SUM_EPS = 1e-9
+
+# 选出来的合同
+# - picks: 挂单下标（对应传入的 names / floats / prices）；为空 = 搜索步数用完了，也没找到能凑出的组合（不代表凑不出）
+# - cost: 总价
+# - avg: 成品磨损
+# - tier: 成品档位名
+# - optimal: 是否确定是最便宜的；搜索步数用完时是 False，picks 是找到的最便宜的能凑出的组合
+ContractPlan = namedtuple("ContractPlan", ["picks", "cost", "avg", "tier", "optimal"])
+
+
+def _next_subsets(sub, m):
+    """
+    同一格里 j 条挂单的子集按价格从低到高展开用（挂单已按价格排好，sub 是下标元组）
+    每个子集只有一个“父”：把最左边能左移的位置左移一格；反过来每个子集最多两个“子”，
+    从 (0..j-1) 出发就能不重不漏、总价不降地走遍所有子集
+    """
+    j = len(sub)
+    q = 0
+    while q < j and sub[q] == q:
+        q += 1
+    out = []
+    for p in (q - 1, q):
+        if 0 <= p < j and sub[p] + 1 < (sub[p + 1] if p + 1 < j else m):
+            out.append(sub[:p] + (sub[p] + 1,) + sub[p + 1:])
+    return out
+
+
+def _inside(offset, prices, ok, sum_lo, sum_hi):
+    """每把的成品磨损都在档位里的挂单挑最便宜的 5 把（平均自然也在档位里），不够 5 把返回 None"""
+    n = CONTRACT_SIZE
+    inside = np.flatnonzero(ok & (offset >= sum_lo / n) & (offset <= sum_hi / n))
+    if len(inside) < n:
+        return None
+    return inside[np.argsort(prices[inside], kind="stable")[:n]].tolist()
+
+
+def _improve(picks, offset, prices, ok, sum_lo, sum_hi):
+    """贪心换便宜的：每轮把某一把换成方案外、换完总和还在 [sum_lo, sum_hi] 里、省得最多的那条，换不动为止"""
+    picks = np.array(picks)
+    free = np.where(ok, prices, np.inf)
+    while True:
+        total = float(offset[picks].sum())
+        cand = free.copy()
+        cand[picks] = np.inf
+        best_gain, best = 0.0, None
+        for i, p in enumerate(picks):
+            rest = total - offset[p]
+            price = np.where((offset >= sum_lo - rest) & (offset <= sum_hi - rest), cand, np.inf)
+            j = int(np.argmin(price))
+            if prices[p] - price[j] > best_gain:
+                best_gain, best = prices[p] - price[j], (i, j)
+        if best is None:
+            return picks.tolist()
+        picks[best[0]] = best[1]
+
+
+def _search(groups, dp, cells, step, sum_lo, sum_hi, cap, accept):
+    """
+    按总价从低到高逐个列出离散总和落在 cells 里的组合，返回第一个 accept(挂单下标列表) 通过的
+    A* 倒推：每个分组之前的 dp 就是剩下几把的精确最低价，所以弹出来的完整组合一定是按价格排好的；
+    同一格的挂单按子集逐个展开（不只是最便宜的前 j 条），离散后挤在同一格的组合一个都不会漏
+    - groups: [(格, 挂单下标, 挂单价格, 挂单偏移, 这一组之前的 dp)]，同一组的挂单按价格从低到高
+    - 已选部分的真实偏移总和加上剩下几把的范围（离散总和 s 格、k 把 -> [s, s + k) 格）
+      已经不可能落进 [sum_lo, sum_hi] 的，不再往下展开
+    - cap: 手里已有的可行方案的总价，下界到了 cap 就说明没有更便宜的，不用再搜
+    返回 (挂单下标列表 or None, 是否搜完)：展开 MAX_EXPANSIONS 步还没结论是 (None, False)
+    堆里的状态 (下界, 序号, g, k, s, 已花, 已选偏移和, 已选, 子集)：
+    子集为 None = 前面几组选完了，轮到第 g 组；否则是第 g 组正在试的 j 条子集
+    """
+    n = CONTRACT_SIZE
+    tie = itertools.count()
+    heap = [(float(dp[n, c]), next(tie), len(groups), n, int(c), 0.0, 0.0, (), None) for c in cells]
+    heapq.heapify(heap)
+    for _ in range(MAX_EXPANSIONS):
+        if not heap:
+            return None, True
+        bound, _, g, k, s, cost, total, picks, sub = heapq.heappop(heap)
+        if bound >= cap:
+            return None, True
+        if sub is None and k == 0:
+            if accept(list(picks)):
+                return list(picks), True
+            continue
+        b_val, members, member_prices, member_offsets, before = groups[g - 1]
+
+        if sub is None:
+            for j in range(min(k, len(members)) + 1):
+                s2 = s - j * b_val
+                if s2 < 0:
+                    break
+                rest = before[k - j, s2]
+                if np.isfinite(rest):
+                    first = tuple(range(j))
+                    bound = cost + float(member_prices[:j].sum()) + rest
+                    heapq.heappush(heap, (bound, next(tie), g, k, s, cost, total, picks, first))
+            continue
+
+        # 同组更贵的子集接着排队；这个子集偏移和还可能落进档位才进入前一组
+        j = len(sub)
+        k2, s2 = k - j, s - j * b_val
+        rest = before[k2, s2]
+        for nxt in _next_subsets(sub, len(members)):
+            heapq.heappush(heap, (cost + float(member_prices[list(nxt)].sum()) + rest, next(tie), g, k, s, cost, total, picks, nxt))
+
+        sub_cost = float(member_prices[list(sub)].sum())
+        total2 = total + float(member_offsets[list(sub)].sum())
+        if total2 + s2 * step > sum_hi + SUM_EPS or total2 + (s2 + k2) * step < sum_lo - SUM_EPS:
+            continue
+        picks2 = picks + tuple(members[list(sub)].tolist())
+        heapq.heappush(heap, (bound, next(tie), g - 1, k2, s2, cost + sub_cost, total2, picks2, None))
+    return None, False
+
+
+def cheapest_contract(engine, target_tier: str, names, floats, prices, resolution: int = SUM_RESOLUTION):
+    """
+    最便宜的合同：从挂单里挑 5 条，平均成品磨损落在 target_tier 区间里，总价最低
+    - engine: tradeup_engine.TradeUpEngine（决定材料区间、成品区间、分档）
+    - names / floats / prices: 挂单的材料枪名、磨损、价格（等长）
+    做法：成品磨损总和离散成 resolution 格，
+    按格做分组背包 DP（状态：已选几把 × 总和落在哪一格），
+    最后用 _search 按总价从低到高逐个列出组合，用 engine 精确校验档位，第一个通过的就是最便宜的；
+    搜之前先凑保底方案（一定凑得出的两种取法，再各自贪心换便宜），搜到它的价钱就停
+    几万条挂单也是一次映射 + 几百上千次 numpy 运算
+    凑不出返回 None；边界附近搜了 MAX_EXPANSIONS 步还没结论时返回保底方案（optimal=False），
+    连保底方案都没有时返回 picks 为空的 ContractPlan
+    """
+    tier_idx = engine.tier_names.index(target_tier)
+    n = CONTRACT_SIZE
+
+    mat_idx = engine.material_index(names)
+    floats = np.asarray(floats, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+
+    # 成品磨损相对成品下限的偏移，档位区间也换成偏移后的总和
+    offset = engine.map_floats(mat_idx, floats) - engine.out_min
+    sum_lo = max(0.0, n * (engine.tier_lo[tier_idx] - engine.out_min))
+    sum_hi = n * (engine.tier_hi[tier_idx] - engine.out_min)
+    if sum_hi < 0:
+        return None
+
+    step = max(sum_hi, 1e-9) / resolution
+    ok = np.isfinite(offset) & (prices > 0) & (offset <= sum_hi)
+    cand = np.flatnonzero(ok)
+    if len(cand) < n:
+        return None
+
+    def accept(picks):
+        res = engine.evaluate(mat_idx[picks][None, :], floats[picks][None, :])
+        return res.tier[0] == tier_idx
+
+    bins = np.floor(offset[cand] / step).astype(np.intp)
+    order = np.lexsort((prices[cand], bins))
+    cand, bins = cand[order], bins[order]
+
+    # 分组背包：同一格的挂单磨损当成一样，DP 里只会按价格从低到高取前 j 条（下界）
+    size = resolution + 1
+    dp = np.full((n + 1, size), np.inf)
+    dp[0, 0] = 0.0
+    groups = []
+    starts = np.r_[0, np.flatnonzero(np.diff(bins)) + 1, len(bins)]
+    for a, b in zip(starts[:-1], starts[1:]):
+        b_val = int(bins[a])
+        members = cand[a:b]
+        prefix = np.r_[0.0, np.cumsum(prices[members[:n]])]
+        new = dp.copy()
+        for j in range(1, len(prefix)):
+            shift = j * b_val
+            if shift >= size:
+                break
+            for k in range(j, n + 1):
+                cost = dp[k - j, :size - shift] + prefix[j]
+                target = new[k, shift:]
+                np.minimum(target, cost, out=target)
+        groups.append((b_val, members, prices[members], offset[members], dp))
+        dp = new
+
+    # 离散后的总和只是下界（每把最多少算一格），边界附近的格子也拿来试，精确校验
+    lo_cell = max(0, int(np.floor(sum_lo / step)) - n)
+    hi_cell = min(size - 1, int(np.floor(sum_hi / step)))
+    cells = np.arange(lo_cell, hi_cell + 1)
+    cells = cells[np.isfinite(dp[n, cells])]
+
+    # 保底方案：每把都在档位里的最便宜 5 把；离散总和离档位边界还有 n 格以上的格子里最便宜的那组
+    # （每把最多少算一格，怎么取都落在档位里）。各自贪心换便宜，取最便宜的当上限
+    safe = cells[(cells >= np.ceil(sum_lo / step)) & (cells <= np.floor(sum_hi / step) - n)]
+    seeds = [_inside(offset, prices, ok, sum_lo, sum_hi), _search(groups, dp, safe, step, sum_lo, sum_hi, np.inf, accept)[0]]
+    seeds = [_improve(p, offset, prices, ok, sum_lo, sum_hi) for p in seeds if p is not None]
+    seeds = [p for p in seeds if accept(p)]
+    seed = min(seeds, key=lambda p: prices[p].sum()) if seeds else None
+    cap = float(prices[seed].sum()) if seed is not None else np.inf
+
+    picks, complete = _search(groups, dp, cells, step, sum_lo, sum_hi, cap, accept)
+    if picks is None:
+        picks = seed
+    if picks is None:
+        return None if complete else ContractPlan([], None, None, target_tier, False)
+    res = engine.evaluate(mat_idx[picks][None, :], floats[picks][None, :])
+    return ContractPlan(picks, float(prices[picks].sum()), float(res.avg[0]), target_tier, complete)
+
+
+def render_planner(engine, key_prefix: str, product: str):
+    """
+    💰 最便宜合同规划（各页面共用）
+    在表格里贴 / 填可买的挂单（材料枪、磨损、价格），选目标成色，挑出最便宜的 5 把
+    - product: 成品叫什么（刀 / 手套），只用于文案
+    """
+    st.subheader("💰 目标成色最便宜的合同：从挂单里挑 5 把材料")
+    st.caption("可以直接从表格软件复制粘贴多行；磨损会按 WEAR_RANGE 夹到材料区间内。")
+
+    target = st.selectbox(f"目标{product}成色：", engine.tier_names, key=f"{key_prefix}_plan_tier")
+    listings = st.data_editor(
+        [{"材料枪": engine.materials[0], "磨损": 0.0, "价格": 0.0}],
+        num_rows="dynamic",
+        column_config={
+            "材料枪": st.column_config.SelectboxColumn(options=engine.materials, required=True),
+            "磨损": st.column_config.NumberColumn(min_value=0.0, max_value=1.0, format="%.6f"),
+            "价格": st.column_config.NumberColumn(min_value=0.0, format="%.2f"),
+        },
+        use_container_width=True,
+        key=f"{key_prefix}_plan_listings",
+    )
+
+    if st.button("计算最便宜合同", key=f"{key_prefix}_btn_plan"):
+        rows = [r for r in listings if r.get("材料枪") in engine.materials and r.get("价格")]
+        if len(rows) < CONTRACT_SIZE:
+            st.error(f"至少要有 {CONTRACT_SIZE} 条带价格的挂单")
+            return
+
+        plan = cheapest_contract(
+            engine,
+            target,
+            [r["材料枪"] for r in rows],
+            [r["磨损"] or 0.0 for r in rows],
+            [r["价格"] for r in rows],
+        )
+        if plan is None:
+            st.warning(f"这些挂单凑不出 {target} 的{product}")
+            return
+        if not plan.picks:
+            st.warning(
+                f"挂单太多挤在 {target} 的边界附近，搜了 {MAX_EXPANSIONS:,} 步还没找到能凑出的组合（不代表凑不出），"
+                "可以删掉一些贴着边界的挂单再试"
+            )
+            return
+
+        if plan.optimal:
+            st.success(f"➡️ 最低总价：**{plan.cost:.2f}** 元，{product}磨损 **{plan.avg:.6f}**（{plan.tier}）")
+        else:
+            st.success(f"➡️ 能凑出的方案：总价 **{plan.cost:.2f}** 元，{product}磨损 **{plan.avg:.6f}**（{plan.tier}）")
+            st.caption(f"⚠️ 边界附近的组合太多，搜了 {MAX_EXPANSIONS:,} 步没搜完，这组不一定是最便宜的。")
+        st.dataframe([rows[i] for i in plan.picks], use_container_width=True)
@@ -0,0 +1,122 @@
+import bisect
+import threading
+from collections import namedtuple
+
+import streamlit as st
+
+# 某个成色下一份合同的期望收益
+# - outcome_avg: 成品池在这个成色下的均价（池里每件等概率）
+# - cost: 材料总成本
+# - profit / roi: 期望利润、期望收益率（成本为 0 时 roi 是 None）
+# - loss_prob: 开出来的成品比成本便宜的概率
+# - outcomes: 这个成色下有价格的成品数
+EV = namedtuple("EV", ["tier", "outcome_avg", "cost", "profit", "roi", "loss_prob", "outcomes"])
+
+
+class OutcomeStats:
+    """
+    成品池每个成色的价格统计，增量维护：
+    - 每个成色一份排好序的价格列表 + 总和
+    - 单个价格变了只在那个成色里 bisect 删旧插新，不重算整池
+    算 EV 只要均价 O(1) + 亏损概率一次二分，页面重跑几乎不花时间
+    进程内一份，各会话的 render 和首页扫描线程都会 sync，所以整个 sync 都在锁里
+    """
+
+    def __init__(self):
+        # sync 持锁调 set_price，要可重入
+        self._lock = threading.RLock()
+        self._prices = {}
+        self._sorted = {}
+        self._sum = {}
+        self._synced = None
+
+    def set_price(self, name: str, tier: str, price):
+        """更新一件成品在某个成色下的价格（0 / None 表示没价格），没变化返回 False"""
+        price = float(price) if price else None
+        with self._lock:
+            old = self._prices.get((name, tier))
+            if old == price:
+                return False
+            prices = self._sorted.setdefault(tier, [])
+            if old is not None:
+                del prices[bisect.bisect_left(prices, old)]
+                self._sum[tier] -= old
+            if price is None:
+                del self._prices[(name, tier)]
+            else:
+                bisect.insort(prices, price)
+                self._sum[tier] = self._sum.get(tier, 0.0) + price
+                self._prices[(name, tier)] = price
+            return True
+
+    def sync(self, items, tiers, price_fn):
+        """
+        对齐到一张只读价格表
+        同一张表（价格库没更新）直接跳过；换了表逐个比对，只改有变化的价格
+        判断、写价格、记下是哪张表都在一把锁里，两张表同时 sync 不会交错写成一半新一半旧
+        - price_fn(item, tier) -> 价格
+        """
+        with self._lock:
+            if items is self._synced:
+                return
+            for i in items:
+                for tier in tiers:
+                    self.set_price(i["name"], tier, price_fn(i, tier))
+            self._synced = items
+
+    def prices(self, tier):
+        """某个成色下成品池里所有有价格的成品价（从低到高的副本）"""
+        with self._lock:
+            return list(self._sorted.get(tier, []))
+
+    def items(self, tier):
+        """某个成色下成品池里有价格的成品 [(名字, 价格)]，从低到高"""
+        with self._lock:
+            return sorted(((n, p) for (n, t), p in self._prices.items() if t == tier), key=lambda x: x[1])
+
+    def evaluate(self, tier: str, cost: float):
+        """材料成本为 cost 时，合出 tier 成色的期望收益；这个成色没有任何价格返回 None"""
+        with self._lock:
+            prices = self._sorted.get(tier)
+            if not prices:
+                return None
+            n = len(prices)
+            avg = self._sum[tier] / n
+            loss_prob = bisect.bisect_left(prices, cost) / n
+        profit = avg - cost
+        return EV(tier, avg, cost, profit, profit / cost if cost else None, loss_prob, n)
+
+
+def render_ev(stats: OutcomeStats, tiers, cost: float, current_tier, product: str, missing=()):
+    """
+    💹 期望收益面板（各页面共用）
+    按当前 5 把材料的成本，每个成色各算一行，当前材料合出的成色标出来
+    - missing: 当前磨损下没有价格、按 0 计入成本的材料
+    """
+    st.subheader("💹 期望收益：当前 5 把材料的成本 vs 成品池")
+    st.caption(f"材料总成本 **{cost:.2f}** 元；成品池里每件等概率开出，亏损概率 = 开出的{product}比成本便宜的概率。")
+    if missing:
+        st.warning(f"这些材料在当前磨损下还没有价格，按 0 计入成本：{'、'.join(dict.fromkeys(missing))}")
+
+    rows = []
+    for tier in tiers:
+        ev = stats.evaluate(tier, cost)
+        rows.append({
+            "成色": tier + (" ⬅️ 当前材料" if tier == current_tier else ""),
+            f"{product}均价": ev.outcome_avg if ev else None,
+            "期望利润": ev.profit if ev else None,
+            "ROI": f"{ev.roi:.1%}" if ev and ev.roi is not None else "",
+            "亏损概率": f"{ev.loss_prob:.0%}" if ev else "",
+            "有价格的成品数": ev.outcomes if ev else 0,
+        })
+    st.dataframe(rows, use_container_width=True)
+
+    ev = stats.evaluate(current_tier, cost) if current_tier else None
+    if ev:
+        msg = f"➡️ 当前材料合出 **{current_tier}**：期望利润 **{ev.profit:.2f}** 元，亏损概率 {ev.loss_prob:.0%}"
+        if ev.profit >= 0:
+            st.success(msg)
+        else:
+            st.error(msg)
+    else:
+        st.info("当前材料合出的成色还没有成品价格，算不了期望收益。")
@@ -0,0 +1,123 @@
+import threading
+from collections import namedtuple
+
+import matplotlib.pyplot as plt
+import numpy as np
+import streamlit as st
+from matplotlib.colors import TwoSlopeNorm
+
+from contract_planner import CONTRACT_SIZE
+
+# 磨损网格的点数（所有材料共用一条横轴）
+POINTS = 500
+
+# 网格计算结果（都是 (材料数, POINTS)，超出材料磨损区间的位置 tier = -1、其余 NaN）
+# - floats: 横轴上的平均材料磨损 (POINTS,)
+# - tier: 5 把这种材料、平均磨损为 floats 时合出的档位下标
+# - outcome: 这个档位的成品均价
+# - value: 每份合同的期望利润 = 成品均价 - 5 把材料的价钱
+FloatGrid = namedtuple("FloatGrid", ["floats", "tier", "outcome", "value"])
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def profit_grid(engine, tier_avg: dict, unit_prices_fn, points: int = POINTS):
+    """
+    一次向量化算出每把材料在整条磨损网格上的成色和期望利润
+    - tier_avg: {档位名: 成品均价}，没有价格的是 None
+    - unit_prices_fn(grid): (材料数, points) 的材料磨损 -> 同形状的单价，没价格是 NaN
+    5 把同一种材料时，平均磨损映射过去就是成品磨损（映射是线性的）
+    """
+    floats = np.linspace(engine.mat_min.min(), engine.mat_max.max(), points)
+    grid = np.broadcast_to(floats, (len(engine.materials), points))
+    inside = (grid >= engine.mat_min[:, None]) & (grid <= engine.mat_max[:, None])
+
+    m_idx = np.arange(len(engine.materials))[:, None]
+    tier = np.where(inside, engine.classify(engine.map_floats(m_idx, grid)), -1)
+    avg_by_tier = np.array([tier_avg.get(t) or np.nan for t in engine.tier_names] + [np.nan])
+    outcome = avg_by_tier[tier]
+    value = np.where(inside, outcome - CONTRACT_SIZE * unit_prices_fn(grid), np.nan)
+    return FloatGrid(floats, tier, outcome, value)
+
+
+def cached_grid(key, snapshot, build_fn):
+    """
+    按价格快照缓存网格：snapshot 是页面 load_data() 的返回值，价格库没更新就是同一个对象
+    换了快照才调 build_fn() 重算
+    """
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] is snapshot:
+            return hit[1]
+    grid = build_fn()
+    with _cache_lock:
+        _cache[key] = (snapshot, grid)
+    return grid
+
+
+def _short(tier_name: str):
+    # "崭新出厂 (FN)" -> "FN"
+    return tier_name[tier_name.find("(") + 1:tier_name.find(")")] if "(" in tier_name else tier_name
+
+
+def _segments(row):
+    # 一行里档位不变的连续区间 [(起点, 终点, 档位下标)]
+    cuts = np.flatnonzero(np.diff(row)) + 1
+    starts = np.concatenate(([0], cuts))
+    stops = np.concatenate((cuts, [len(row)]))
+    return [(a, b, int(row[a])) for a, b in zip(starts, stops)]
+
+
+def render_float_heatmap(grid: FloatGrid, engine, product: str):
+    """
+    🌡️ 材料磨损 × 期望利润热力图（各页面共用）
+    每行一把材料，横轴是 5 把材料的平均磨损，颜色是每份合同的期望利润，格子里标出合出的成色
+    """
+    st.subheader("🌡️ 材料磨损越高越便宜，值不值？磨损 × 期望利润热力图")
+    st.caption(
+        f"每行 = 5 把同一种材料，横轴 = 平均磨损，颜色 = 每份合同的期望利润"
+        f"（{product}均价 - 材料价），灰色 = 超出材料区间或没有价格。"
+    )
+
+    fig, ax = plt.subplots(figsize=(12, 0.8 * len(engine.materials) + 1.5))
+    cmap = plt.get_cmap("RdYlGn").copy()
+    cmap.set_bad("lightgray")
+    finite = grid.value[np.isfinite(grid.value)]
+    lo, hi = (float(finite.min()), float(finite.max())) if finite.size else (0.0, 0.0)
+    im = ax.imshow(
+        np.ma.masked_invalid(grid.value),
+        aspect="auto",
+        cmap=cmap,
+        norm=TwoSlopeNorm(0.0, lo, hi) if lo < 0 < hi else None,
+        extent=(grid.floats[0], grid.floats[-1], len(engine.materials) - 0.5, -0.5),
+        interpolation="nearest",
+    )
+
+    step = grid.floats[1] - grid.floats[0]
+    rows = []
+    for m, material in enumerate(engine.materials):
+        for a, b, t in _segments(grid.tier[m]):
+            if t < 0:
+                continue
+            x0, x1 = grid.floats[a], grid.floats[b - 1]
+            ax.axvline(x0 - step / 2, ymin=1 - (m + 1) / len(engine.materials), ymax=1 - m / len(engine.materials), color="black", linewidth=0.8)
+            ax.text((x0 + x1) / 2, m, _short(engine.tier_names[t]), ha="center", va="center", fontsize=8)
+            seg = grid.value[m, a:b]
+            best = int(np.nanargmax(seg)) if np.isfinite(seg).any() else None
+            rows.append({
+                "材料枪": material,
+                "成色": engine.tier_names[t],
+                "平均磨损从": round(float(x0), 4),
+                "到": round(float(x1), 4),
+                f"{product}均价": None if np.isnan(grid.outcome[m, a]) else float(grid.outcome[m, a]),
+                "最高期望利润": None if best is None else float(seg[best]),
+                "在磨损": None if best is None else round(float(grid.floats[a + best]), 4),
+            })
+
+    ax.set_yticks(range(len(engine.materials)))
+    ax.set_yticklabels(engine.materials)
+    ax.set_xlabel("5 把材料的平均磨损")
+    fig.colorbar(im, ax=ax, label="每份合同期望利润 (¥)")
+    st.pyplot(fig)
+    st.dataframe(rows, use_container_width=True)
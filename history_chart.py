@@ -0,0 +1,61 @@
+import time
+from datetime import datetime
+
+import matplotlib.pyplot as plt
+import streamlit as st
+
+import price_store
+
+# 时间范围选项（天，None = 全部）
+HISTORY_RANGES = {
+    "7 天": 7,
+    "30 天": 30,
+    "90 天": 90,
+    "全部": None,
+}
+
+# 一张图最多画多少个点，再多就按时间分桶
+MAX_POINTS = 500
+
+
+def render_history(case_key: str, names, tiers, key_prefix: str, tier_of=None):
+    """
+    📈 历史价格走势（各页面共用）
+    - names: 可选的物品（刀 / 手套 / 红皮）
+    - tiers: 可选的磨损档位，只有一个时不显示档位选择
+    - tier_of(name, tier): 这一档的价格存在哪一档（几个档位共用一个价格的刀），默认就是自己
+    """
+    st.subheader("📈 历史价格走势")
+
+    cols = st.columns([2, 1, 1] if len(tiers) > 1 else [2, 1])
+    with cols[0]:
+        name = st.selectbox("选择物品：", names, key=f"{key_prefix}_hist_item")
+    if len(tiers) > 1:
+        with cols[1]:
+            tier = st.selectbox("磨损档位：", tiers, index=min(2, len(tiers) - 1), key=f"{key_prefix}_hist_tier")
+    else:
+        tier = tiers[0]
+    if tier_of is not None:
+        tier = tier_of(name, tier)
+    with cols[-1]:
+        range_label = st.selectbox("时间范围：", list(HISTORY_RANGES), index=1, key=f"{key_prefix}_hist_range")
+
+    days = HISTORY_RANGES[range_label]
+    since = None if days is None else time.time() - days * 86400
+    points = price_store.query_history(case_key, name, tier, since=since, max_points=MAX_POINTS)
+
+    if not points:
+        st.info("这段时间还没有历史价格，后台拉价后会自动积累。")
+        return
+
+    xs = [datetime.fromtimestamp(ts) for ts, _ in points]
+    ys = [p for _, p in points]
+
+    fig, ax = plt.subplots(figsize=(10, 3))
+    ax.plot(xs, ys, marker=".", linewidth=1)
+    ax.set_ylabel("价格 (¥)")
+    ax.set_title(f"{name} - {tier}")
+    fig.autofmt_xdate()
+
+    st.pyplot(fig)
+    st.caption(f"共 {len(points)} 个点，最低 {min(ys):.2f}，最高 {max(ys):.2f}，最新 {ys[-1]:.2f}")
@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+from collections import namedtuple
+
+import numpy as np
+import streamlit as st
+
+# 认这些列名（CSV 表头 / JSON 字段），按顺序取第一个有值的
+NAME_COLUMNS = ("材料枪", "name", "名称")
+FLOAT_COLUMNS = ("磨损", "float", "wear")
+
+# 表格每页行数
+PAGE_SIZES = [50, 100, 500]
+
+# 报错最多列出多少条
+MAX_ERRORS_SHOWN = 200
+
+# 导入 + 计算结果（数组都按文件里的顺序）
+# - names / floats / lines: 解析出来的材料枪名、磨损、在文件里是第几条
+# - valid: 通过校验的行
+# - out_float / tier: 每件材料映射到成品的磨损、档位下标（没通过校验的是 NaN / -1）
+# - errors: [(行号, 原因)]，按行号排，校验类的问题每种最多记 MAX_ERRORS_SHOWN 条
+# - bad: 有问题的总行数
+ImportResult = namedtuple("ImportResult", ["names", "floats", "lines", "valid", "out_float", "tier", "errors", "bad"])
+
+
+def _pick(record, columns):
+    for c in columns:
+        v = record.get(c)
+        if v not in (None, ""):
+            return v
+    return None
+
+
+def parse_inventory(raw: bytes, filename: str):
+    """
+    读 CSV / JSON 库存文件
+    - CSV：带表头，列名见 NAME_COLUMNS / FLOAT_COLUMNS
+    - JSON：对象列表，或 {"items": [...]}
+    返回 (names, floats, lines, errors)，解析不了的行记在 errors 里跳过
+    """
+    text = raw.decode("utf-8-sig")
+    if filename.lower().endswith(".json"):
+        data = json.loads(text)
+        records = data.get("items", []) if isinstance(data, dict) else data
+        if not isinstance(records, list):
+            raise ValueError("JSON 里要是记录列表")
+    else:
+        records = csv.DictReader(io.StringIO(text))
+
+    names, floats, lines, errors = [], [], [], []
+    for line, r in enumerate(records, start=1):
+        if not isinstance(r, dict):
+            errors.append((line, "不是一条记录"))
+            continue
+        name = _pick(r, NAME_COLUMNS)
+        wear = _pick(r, FLOAT_COLUMNS)
+        if name is None:
+            errors.append((line, "缺少材料枪名"))
+            continue
+        try:
+            wear = float(wear)
+        except (TypeError, ValueError):
+            errors.append((line, f"磨损不是数字：{wear}"))
+            continue
+        names.append(str(name).strip())
+        floats.append(wear)
+        lines.append(line)
+    return names, np.asarray(floats, dtype=float), lines, errors
+
+
+def evaluate_inventory(engine, names, floats, lines=None, errors=()):
+    """
+    一次向量化校验 + 计算整批库存
+    - 材料枪必须在 WEAR_RANGE 里，磨损必须落在它的区间内
+    - 通过的逐件映射到成品磨损并分档
+    """
+    floats = np.asarray(floats, dtype=float)
+    lines = list(range(1, len(names) + 1)) if lines is None else lines
+    idx = engine.lookup(names)
+    known = idx >= 0
+    safe_idx = np.where(known, idx, 0)
+    in_range = (
+        known
+        & np.isfinite(floats)
+        & (floats >= engine.mat_min[safe_idx])
+        & (floats <= engine.mat_max[safe_idx])
+    )
+
+    out_float = np.full(len(floats), np.nan)
+    out_float[in_range] = engine.map_floats(idx[in_range], floats[in_range])
+    tier = engine.classify(out_float)
+
+    errors = list(errors)
+    bad = len(errors) + int((~in_range).sum())
+    for i in np.flatnonzero(~known)[:MAX_ERRORS_SHOWN]:
+        errors.append((lines[i], f"WEAR_RANGE 里没有：{names[i]}"))
+    for i in np.flatnonzero(known & ~in_range)[:MAX_ERRORS_SHOWN]:
+        m_min, m_max = engine.mat_min[idx[i]], engine.mat_max[idx[i]]
+        errors.append((lines[i], f"{names[i]} 的磨损 {floats[i]} 不在 [{m_min:.2f} ~ {m_max:.2f}]"))
+    errors.sort()
+    return ImportResult(names, floats, lines, in_range, out_float, tier, errors, bad)
+
+
+def render_import(engine, key_prefix: str, product: str):
+    """
+    📥 批量导入库存并逐件算成品磨损 / 成色（各页面共用）
+    文件只在上传 / 换引擎时解析计算一次，结果放在 session_state，翻页只切片
+    """
+    st.subheader("📥 批量导入材料：逐件算映射后的磨损和成色")
+    st.caption("上传 CSV（表头：材料枪,磨损 或 name,float）或 JSON（[{\"name\": ..., \"float\": ...}]）。")
+
+    up = st.file_uploader("库存文件", type=["csv", "json"], key=f"{key_prefix}_import_file")
+    if up is None:
+        return
+
+    state_key = f"{key_prefix}_import_result"
+    sig = (up.file_id, id(engine))
+    cached = st.session_state.get(state_key)
+    if cached is None or cached[0] != sig:
+        try:
+            names, floats, lines, errors = parse_inventory(up.getvalue(), up.name)
+        except (ValueError, csv.Error) as e:
+            st.error(f"文件读不了：{e}")
+            return
+        cached = (sig, evaluate_inventory(engine, names, floats, lines, errors))
+        st.session_state[state_key] = cached
+    res = cached[1]
+
+    n_valid = int(res.valid.sum())
+    st.success(f"➡️ 读到 {len(res.names)} 件，通过校验 **{n_valid}** 件")
+    if res.bad:
+        with st.expander(f"⚠️ {res.bad} 行有问题（最多列出 {MAX_ERRORS_SHOWN} 条）"):
+            st.dataframe(
+                [{"行": line, "原因": reason} for line, reason in res.errors[:MAX_ERRORS_SHOWN]],
+                use_container_width=True,
+            )
+
+    counts = np.bincount(res.tier[res.valid], minlength=len(engine.tier_names)) if n_valid else []
+    st.dataframe(
+        [{"成色": t, "件数": int(c)} for t, c in zip(engine.tier_names, counts) if c],
+        use_container_width=True,
+    )
+
+    col_a, col_b = st.columns(2)
+    with col_a:
+        page_size = st.selectbox("每页行数：", PAGE_SIZES, index=1, key=f"{key_prefix}_import_page_size")
+    pages = max(1, -(-len(res.names) // page_size))
+    with col_b:
+        page = st.number_input(f"第几页（共 {pages} 页）", min_value=1, max_value=pages, value=1, key=f"{key_prefix}_import_page")
+
+    start = (page - 1) * page_size
+    stop = min(start + page_size, len(res.names))
+    st.dataframe(
+        [
+            {
+                "行": res.lines[i],
+                "材料枪": res.names[i],
+                "材料磨损": float(res.floats[i]),
+                f"映射到{product}磨损": float(res.out_float[i]) if res.valid[i] else None,
+                "成色": engine.tier_name(res.tier[i]) if res.valid[i] else "校验未通过",
+            }
+            for i in range(start, stop)
+        ],
+        use_container_width=True,
+    )
@@ -0,0 +1,128 @@
+from collections import namedtuple
+
+import numpy as np
+import streamlit as st
+
+from contract_planner import CONTRACT_SIZE
+
+# 拆分结果
+# - groups: (M, 5) 每份合同用到的库存下标
+# - avg: (M,) 每份合同的成品磨损
+# - tier: (M,) 成品档位下标（对应 engine.tier_names）
+# - leftover: 凑不满一份合同 / 映射不了的库存下标
+Partition = namedtuple("Partition", ["groups", "avg", "tier", "leftover"])
+
+
+def _deal(m: int):
+    """把排好序的前 5m 件蛇形发到 m 份合同里（0..m-1, m-1..0, ...），各份总和尽量接近"""
+    pos = np.arange(CONTRACT_SIZE * m).reshape(CONTRACT_SIZE, m)
+    pos[1::2] = pos[1::2, ::-1]
+    return pos.T
+
+
+def _max_groups(sorted_vals, hi: float):
+    """最小的若干件能凑出几份平均 ≤ hi 的合同（二分 + 蛇形分配校验）"""
+    lo_m, hi_m = 0, len(sorted_vals) // CONTRACT_SIZE
+    while lo_m < hi_m:
+        m = (lo_m + hi_m + 1) // 2
+        if (sorted_vals[_deal(m)].mean(axis=1) <= hi).all():
+            lo_m = m
+        else:
+            hi_m = m - 1
+    return lo_m
+
+
+def partition_inventory(engine, names, floats):
+    """
+    把整批库存拆成尽量多份 5 把的合同，每份尽量合到好的档位
+    贪心：按成品磨损从低到高排，从最好的档位开始，
+    用剩下最低的那些材料凑出这一档最多能凑的份数，剩下的留给下一档；
+    最差一档的上限就是成品上限，所以最后总能凑满 件数 // 5 份
+    几千件也只是几次排序 + 二分，不做组合枚举
+    """
+    mat_idx = engine.material_index(names)
+    floats = np.asarray(floats, dtype=float)
+    mapped = engine.map_floats(mat_idx, floats)
+
+    valid = np.flatnonzero(np.isfinite(mapped))
+    remaining = valid[np.argsort(mapped[valid], kind="stable")]
+
+    groups = []
+    for hi in engine.tier_hi:
+        m = _max_groups(mapped[remaining], hi)
+        if m:
+            take = remaining[:CONTRACT_SIZE * m]
+            groups.append(take[_deal(m)])
+            remaining = remaining[CONTRACT_SIZE * m:]
+
+    groups = np.vstack(groups) if groups else np.empty((0, CONTRACT_SIZE), dtype=np.intp)
+    res = engine.evaluate(mat_idx[groups], floats[groups])
+    invalid = np.flatnonzero(~np.isfinite(mapped))
+    return Partition(groups, res.avg, res.tier, np.r_[remaining, invalid])
+
+
+def render_partitioner(engine, tier_prices: dict, key_prefix: str, product: str):
+    """
+    📦 库存批量拆合同（各页面共用）
+    - tier_prices: {档位名: 成品均价 或 None}，用来算期望价值（没价格的档位小计留空）
+    - product: 成品叫什么（刀 / 手套），只用于文案
+    """
+    st.subheader("📦 手上的材料一次拆成多份合同")
+    st.caption("把库存里的材料枪和磨损贴进来，按成色从好到坏尽量多凑合同，估算总期望价值。")
+
+    inventory = st.data_editor(
+        [{"材料枪": engine.materials[0], "磨损": 0.0}],
+        num_rows="dynamic",
+        column_config={
+            "材料枪": st.column_config.SelectboxColumn(options=engine.materials, required=True),
+            "磨损": st.column_config.NumberColumn(min_value=0.0, max_value=1.0, format="%.6f"),
+        },
+        use_container_width=True,
+        key=f"{key_prefix}_part_inventory",
+    )
+
+    if st.button("拆分合同", key=f"{key_prefix}_btn_part"):
+        rows = [r for r in inventory if r.get("材料枪") in engine.materials]
+        if len(rows) < CONTRACT_SIZE:
+            st.error(f"至少要有 {CONTRACT_SIZE} 件材料")
+            return
+
+        part = partition_inventory(
+            engine,
+            [r["材料枪"] for r in rows],
+            [r["磨损"] or 0.0 for r in rows],
+        )
+
+        summary = []
+        total = 0.0
+        for t, tier_name in enumerate(engine.tier_names):
+            count = int((part.tier == t).sum())
+            if not count:
+                continue
+            price = tier_prices.get(tier_name)
+            if price:
+                total += count * price
+            summary.append({
+                "成色": tier_name,
+                "合同数": count,
+                f"{product}均价": price,
+                "小计": count * price if price else None,
+            })
+
+        st.success(
+            f"➡️ 共 **{len(part.groups)}** 份合同，剩 {len(part.leftover)} 件；"
+            f"总期望价值 **{total:.2f}** 元（没价格的档位不计入）"
+        )
+        st.dataframe(summary, use_container_width=True)
+        st.dataframe(
+            [
+                {
+                    "合同": i + 1,
+                    "成色": engine.tier_name(part.tier[i]),
+                    f"{product}磨损": float(part.avg[i]),
+                    "材料": "；".join(f"{rows[j]['材料枪']} {rows[j]['磨损'] or 0.0:.4f}" for j in g),
+                }
+                for i, g in enumerate(part.groups)
+            ],
+            use_container_width=True,
+        )
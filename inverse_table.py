@@ -0,0 +1,77 @@
+import csv
+import functools
+import io
+import json
+
+import numpy as np
+import streamlit as st
+
+
+@functools.lru_cache(maxsize=None)
+def _build(engines):
+    """
+    把几套引擎的反推表拼成一张大表 + 导出内容，同一组引擎只拼一次
+    - engines: ((模式名, TradeUpEngine), ...)
+    返回 (表格行, CSV 文本, JSON 文本)
+    """
+    first = engines[0][1]
+    rows = []
+    for m, material in enumerate(first.materials):
+        row = {
+            "材料枪": material,
+            "磨损下限": float(first.mat_min[m]),
+            "磨损上限": float(first.mat_max[m]),
+        }
+        for label, engine in engines:
+            for t, tier in enumerate(engine.tier_names):
+                v = engine.inverse[m, t]
+                row[f"{label} {tier}"] = None if np.isnan(v) else round(float(v), 6)
+        rows.append(row)
+
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+
+    data = {
+        label: {
+            material: {
+                tier: None if np.isnan(engine.inverse[m, t]) else round(float(engine.inverse[m, t]), 6)
+                for t, tier in enumerate(engine.tier_names)
+            }
+            for m, material in enumerate(engine.materials)
+        }
+        for label, engine in engines
+    }
+    return rows, buf.getvalue(), json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def render_inverse_table(engines: dict, key_prefix: str):
+    """
+    📋 反推总表（各页面共用）：每把材料 × 每个档位 × 每种模式的最高可用磨损
+    - engines: {模式名: TradeUpEngine}，材料列表要一致
+    表在引擎构造时就算好了，这里只拼表 / 导出（也只做一次）
+    """
+    st.subheader("📋 反推总表：每把材料要合出每种成色，最高能用多少磨损")
+    st.caption("空格 = 这种成色合不出来。可以导出给收货脚本直接用。")
+
+    rows, csv_text, json_text = _build(tuple(engines.items()))
+    st.dataframe(rows, use_container_width=True)
+
+    col_a, col_b = st.columns(2)
+    with col_a:
+        st.download_button(
+            "⬇️ 导出 CSV",
+            csv_text.encode("utf-8-sig"),
+            file_name=f"{key_prefix}_inverse_table.csv",
+            mime="text/csv",
+            key=f"{key_prefix}_inverse_csv",
+        )
+    with col_b:
+        st.download_button(
+            "⬇️ 导出 JSON",
+            json_text.encode("utf-8"),
+            file_name=f"{key_prefix}_inverse_table.json",
+            mime="application/json",
+            key=f"{key_prefix}_inverse_json",
+        )
@@ -4,9 +4,14 @@ import Snakebite_Recoil_Case
 import Spectrum_Case
 import Dreams_Nightmares_Operation_Riptide_Case
 import Revolution_Clutch_Case
+import price_refresher
+import recipe_scan
 
 st.set_page_config(page_title="CS2 炼金工具合集", layout="wide")
 
+# 后台拉价线程：每个服务进程只启动一次
+price_refresher.ensure_started()
+
 # 初始化页面状态
 if "page" not in st.session_state:
     st.session_state.page = "home"
@@ -38,6 +43,14 @@ if st.session_state.page == "home":
         if st.button("💀 命悬 / 变革 手套炼金", use_container_width=True):
             st.session_state.page = "revolution"
 
+    st.divider()
+    recipe_scan.render_scanner({
+        "🐍 蛇噬 / 反冲 手套": Snakebite_Recoil_Case,
+        "✨ 光谱武器箱 刀": Spectrum_Case,
+        "😈 梦魇 / 激流大行动 刀": Dreams_Nightmares_Operation_Riptide_Case,
+        "💀 命悬 / 变革 手套": Revolution_Clutch_Case,
+    })
+
 # ========== 各自页面 ==========
 elif st.session_state.page == "snake":
     st.button("⬅ 返回首页", on_click=lambda: st.session_state.update({"page": "home"}))
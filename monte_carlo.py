@@ -0,0 +1,194 @@
+import multiprocessing
+import os
+import sys
+import threading
+import types
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.pyplot as plt
+import numpy as np
+import streamlit as st
+
+# 每个进程一次算多少条路径（一批内全部向量化）
+TRIALS_PER_BATCH = 20000
+
+# 进程池大小
+MAX_PROCESSES = os.cpu_count() or 2
+
+# 本金分布按固定格子统计，各批结果直接相加再取分位数，不用把整条路径传回来
+HIST_BINS = 2000
+
+# 最多在多少个时间点上画分位数带
+MAX_CHECKPOINTS = 50
+
+# 画哪些分位数
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# 可选的模拟次数
+TRIAL_OPTIONS = [100_000, 1_000_000, 5_000_000]
+
+# 模拟结果
+# - steps: 取样的第几份合同 (K,)
+# - bands: {分位数: 每个取样点上的本金 (K,)}
+# - ruin_prob: 中途本金不够再开一份合同的比例
+# - mean_final: 最后本金的均值
+# - below_start: 最后本金低于起始本金的比例
+# - trials: 模拟次数
+SimResult = namedtuple("SimResult", ["steps", "bands", "ruin_prob", "mean_final", "below_start", "trials"])
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """
+    进程内共享的进程池，第一次模拟时才创建
+    用 spawn 起子进程：streamlit 进程里有后台拉价线程和锁，fork 出来的子进程可能卡在别人持有的锁上
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=MAX_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def _submit_all(args):
+    """
+    把每批交给进程池，返回 future 列表
+    spawn 的子进程会把 __main__ 对应的脚本再跑一遍，而 streamlit 把 main.py 装成了 __main__，
+    等于每个子进程里再起一整个应用（读 secrets、开后台拉价线程）；子进程是提交时按需启动的，
+    提交期间把 __main__ 临时换成空模块，子进程就只导入本模块
+    """
+    pool = _get_pool()
+    with _pool_lock:
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            return [pool.submit(_run_batch, *a) for a in args]
+        finally:
+            sys.modules["__main__"] = main
+
+
+def _bounds(prices, cost, bankroll, steps):
+    # 第 k 份合同之后本金可能的范围，每个取样点各用一套格子
+    lo = bankroll + steps * min(0.0, prices.min() - cost)
+    hi = bankroll + steps * max(0.0, prices.max() - cost)
+    return lo, np.maximum(hi, lo + 1e-9)
+
+
+def _run_batch(prices, cost, bankroll, n_contracts, steps, trials, seed):
+    """一批路径：每一步所有路径一起抽一次成品；本金不够开下一份的路径停在原地，记为破产"""
+    rng = np.random.default_rng(seed)
+    lo, hi = _bounds(prices, cost, bankroll, steps)
+    bank = np.full(trials, float(bankroll))
+    ruined = np.zeros(trials, dtype=bool)
+    hist = np.zeros((len(steps), HIST_BINS), dtype=np.int64)
+
+    k = 0
+    for step in range(1, n_contracts + 1):
+        alive = bank >= cost
+        ruined |= ~alive
+        draws = prices[rng.integers(0, len(prices), size=trials)]
+        bank = np.where(alive, bank + draws - cost, bank)
+        if step == steps[k]:
+            pos = (bank - lo[k]) / (hi[k] - lo[k]) * HIST_BINS
+            hist[k] = np.bincount(np.clip(pos.astype(np.intp), 0, HIST_BINS - 1), minlength=HIST_BINS)
+            k += 1
+    return hist, int(ruined.sum()), float(bank.sum()), int((bank < bankroll).sum())
+
+
+def simulate(outcome_prices, cost: float, bankroll: float, n_contracts: int, trials: int, seed=None):
+    """
+    蒙特卡洛：连续开 n_contracts 份合同，每份花 cost，从成品池里等概率抽一件按价格卖掉
+    trials 条路径切成若干批，分给进程池并行算，每批内部全部向量化
+    """
+    prices = np.asarray(outcome_prices, dtype=float)
+    steps = np.unique(np.linspace(1, n_contracts, min(n_contracts, MAX_CHECKPOINTS)).round().astype(int))
+    sizes = [TRIALS_PER_BATCH] * (trials // TRIALS_PER_BATCH)
+    if trials % TRIALS_PER_BATCH:
+        sizes.append(trials % TRIALS_PER_BATCH)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(prices, cost, bankroll, n_contracts, steps, size, s) for size, s in zip(sizes, seeds)]
+
+    if len(args) == 1:
+        results = [_run_batch(*args[0])]
+    else:
+        results = [f.result() for f in _submit_all(args)]
+
+    hist = sum(r[0] for r in results)
+    lo, hi = _bounds(prices, cost, bankroll, steps)
+    cum = np.cumsum(hist, axis=1) / trials
+    width = (hi - lo) / HIST_BINS
+    bands = {}
+    for p in PERCENTILES:
+        b = np.argmax(cum >= p / 100, axis=1)
+        bands[p] = lo + (b + 0.5) * width
+
+    return SimResult(
+        steps,
+        bands,
+        sum(r[1] for r in results) / trials,
+        sum(r[2] for r in results) / trials,
+        sum(r[3] for r in results) / trials,
+        trials,
+    )
+
+
+def render_simulator(outcome_prices, cost: float, key_prefix: str, product: str, missing=()):
+    """
+    🎲 蒙特卡洛模拟面板（各页面共用）
+    - outcome_prices: 当前材料合出的成色下，成品池里每件的价格
+    - cost: 每份合同的材料成本
+    - missing: 当前磨损下没有价格的材料，有的话成本不准，不模拟
+    点按钮才算，结果连同当时的输入放在 session_state；输入（参数、材料、价格）变了就不再显示旧结果
+    """
+    st.subheader("🎲 连续开 N 份合同：本金会怎么变？（蒙特卡洛）")
+    if missing:
+        st.info(f"这些材料在当前磨损下还没有价格，成本不准，没法模拟：{'、'.join(dict.fromkeys(missing))}")
+        return
+    if len(outcome_prices) == 0 or not cost:
+        st.info(f"当前材料合出的成色还没有{product}价格，或者材料成本为 0，没法模拟。")
+        return
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        bankroll = st.number_input("起始本金（元）", min_value=float(cost), value=float(cost) * 10, step=100.0, key=f"{key_prefix}_mc_bankroll")
+    with c2:
+        n_contracts = st.number_input("合同份数", min_value=1, max_value=1000, value=20, step=1, key=f"{key_prefix}_mc_contracts")
+    with c3:
+        trials = st.selectbox("模拟次数", TRIAL_OPTIONS, format_func=lambda n: f"{n:,}", key=f"{key_prefix}_mc_trials")
+
+    state_key = f"{key_prefix}_mc_result"
+    inputs = (tuple(outcome_prices), float(cost), float(bankroll), int(n_contracts), trials)
+    if st.button("开始模拟", key=f"{key_prefix}_btn_mc"):
+        with st.spinner("模拟中..."):
+            st.session_state[state_key] = (inputs, simulate(outcome_prices, cost, bankroll, int(n_contracts), trials))
+
+    saved = st.session_state.get(state_key)
+    if saved is None:
+        return
+    if saved[0] != inputs:
+        st.caption("参数、材料或价格变了，点“开始模拟”重新算。")
+        return
+    res = saved[1]
+
+    st.success(
+        f"➡️ {res.trials:,} 次模拟：最后本金均值 **{res.mean_final:.2f}** 元，"
+        f"中位数 **{res.bands[50][-1]:.2f}** 元；破产概率 **{res.ruin_prob:.1%}**，"
+        f"亏本概率 {res.below_start:.1%}"
+    )
+
+    fig, ax = plt.subplots(figsize=(10, 3.5))
+    ax.fill_between(res.steps, res.bands[5], res.bands[95], alpha=0.2, label="5% ~ 95%")
+    ax.fill_between(res.steps, res.bands[25], res.bands[75], alpha=0.4, label="25% ~ 75%")
+    ax.plot(res.steps, res.bands[50], label="中位数")
+    ax.set_xlabel("第几份合同")
+    ax.set_ylabel("本金 (¥)")
+    ax.set_title("本金分位数带")
+    ax.legend(loc="upper left", fontsize=8)
+    st.pyplot(fig)
@@ -0,0 +1,39 @@
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+# ================== 跨进程文件锁 ==================
+@contextmanager
+def file_lock(path: Path):
+    """
+    对 path 加排他锁（锁文件是 path + ".lock"），多个 Streamlit 进程写同一个目录也不会互相踩
+    Linux / macOS 用 fcntl，Windows 用 msvcrt
+    """
+    lock_path = path.with_name(path.name + ".lock")
+    with open(lock_path, "a+b") as fh:
+        if os.name == "nt":
+            import msvcrt
+
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK 自己重试 10 秒后会报错，继续等
+                    time.sleep(0.1)
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
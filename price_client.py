@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import namedtuple
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+import refresh_priority
+from price_cache import TTLCache
+from rate_limit import TokenBucket
+from single_flight import SingleFlight
+
+# ================== 基础配置 ==================
+PRICE_URL = "https://open.steamdt.com/open/cs2/v1/price/single"
+
+def _setting(name: str, default):
+    """secrets.toml 里的可选配置，没配（或者根本没有 secrets.toml）就用默认值"""
+    try:
+        return st.secrets.get(name, default)
+    except FileNotFoundError:
+        return default
+
+
+# 并发拉价数：拉价线程池、连接池、批量拉价同时在途的请求数都是它
+# secrets.toml 里可以用 FETCH_WORKERS 改（配额大就调高，限速还是由下面的令牌桶管）
+MAX_WORKERS = max(1, int(_setting("FETCH_WORKERS", 8)))
+
+# 价格缓存：同一个 marketHashName 在 TTL 内直接复用，所有会话共享
+PRICE_CACHE_TTL = 300
+PRICE_CACHE_SIZE = 2048
+
+PRICE_CACHE = TTLCache(ttl=PRICE_CACHE_TTL, maxsize=PRICE_CACHE_SIZE)
+
+# 限速：按 SteamDT 配额调整（每秒请求数 + 允许的突发数）
+RATE_LIMIT_PER_SEC = 10
+RATE_LIMIT_BURST = 10
+
+RATE_LIMITER = TokenBucket(rate=RATE_LIMIT_PER_SEC, capacity=RATE_LIMIT_BURST)
+
+# 同一个 marketHashName 同时只发一个请求，其余的等结果
+IN_FLIGHT = SingleFlight()
+
+# 每个 marketHashName 最近一次拉到的价格（不过期），页面渲染只读这里
+LatestPrice = namedtuple("LatestPrice", ["price", "fetched_at", "volatility"])
+
+_latest = {}
+# 每个 marketHashName 上次拉失败的时间，拉成功就清掉（增量刷新据此退避）
+_failed = {}
+_latest_lock = threading.Lock()
+
+# 拉到新价格后的回调（比如写价格库）
+_listeners = []
+
+_session = None
+_session_lock = threading.Lock()
+
+
+# ================== 共享连接池 ==================
+def get_session():
+    """
+    进程内共享的 requests.Session（keep-alive 连接池）
+    四个页面都用它，避免每次拉价都重新 TCP + TLS 握手
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=MAX_WORKERS,
+                    pool_block=True,
+                )
+                s.mount("https://", adapter)
+                _session = s
+    return _session
+
+
+# ================== 拉价 ==================
+def fetch_lowest_price(market_hash, api_key):
+    """
+    先查进程内缓存，没命中才真正请求 SteamDT
+    并发的相同请求会合并成一次（single-flight）
+    拉失败（None）不缓存，下次还会重试
+    """
+    cached = PRICE_CACHE.get(market_hash)
+    if cached is not None:
+        return cached
+
+    return IN_FLIGHT.do(market_hash, _fetch_and_cache, market_hash, api_key)
+
+
+def _fetch_and_cache(market_hash, api_key):
+    # 可能刚有一个同名请求结束并写了缓存，再看一眼
+    cached = PRICE_CACHE.get(market_hash)
+    if cached is not None:
+        return cached
+
+    p = _request_lowest_price(market_hash, api_key)
+    if p is None:
+        with _latest_lock:
+            _failed[market_hash] = time.time()
+    else:
+        PRICE_CACHE.set(market_hash, p)
+        latest = _remember(market_hash, p, time.time())
+        for fn in list(_listeners):
+            try:
+                fn(market_hash, latest)
+            except Exception:
+                pass
+    return p
+
+
+def add_listener(fn):
+    """每次真正从 SteamDT 拉到新价格后回调 fn(market_hash, LatestPrice)，在拉价线程里执行"""
+    _listeners.append(fn)
+
+
+def _remember(market_hash, price, fetched_at):
+    with _latest_lock:
+        old = _latest.get(market_hash)
+        if old is None:
+            volatility = 0.0
+        else:
+            volatility = refresh_priority.next_volatility(old.price, price, old.volatility)
+        latest = LatestPrice(price, fetched_at, volatility)
+        _latest[market_hash] = latest
+        _failed.pop(market_hash, None)
+        return latest
+
+
+def latest_price(market_hash):
+    """
+    最近一次拉到的价格快照，不走网络
+    返回 LatestPrice(price, fetched_at, volatility) 或 None
+    """
+    with _latest_lock:
+        return _latest.get(market_hash)
+
+
+def seed_latest(market_hash, price, fetched_at, volatility: float = 0.0):
+    """用数据文件里存的价格预热快照（只在快照没有或更旧时写入）"""
+    if not market_hash or not price or not fetched_at:
+        return
+    with _latest_lock:
+        old = _latest.get(market_hash)
+        if old is None or old.fetched_at < fetched_at:
+            _latest[market_hash] = LatestPrice(price, fetched_at, volatility)
+
+
+def stale_hashes(hashes, max_age: float = refresh_priority.STALE_AFTER, limit: int | None = None):
+    """按快照里的拉价时间、波动和上次拉失败的时间，挑出需要增量刷新的 marketHashName"""
+    with _latest_lock:
+        candidates = []
+        for mh in dict.fromkeys(h for h in hashes if h):
+            entry = _latest.get(mh)
+            failed_at = _failed.get(mh)
+            if entry is None:
+                candidates.append((mh, None, 0.0, failed_at))
+            else:
+                candidates.append((mh, entry.fetched_at, entry.volatility, failed_at))
+    return refresh_priority.pick_stale(candidates, max_age, limit)
+
+
+def _request_lowest_price(market_hash, api_key):
+    RATE_LIMITER.wait()
+    try:
+        r = get_session().get(
+            PRICE_URL,
+            headers={"Authorization": f"Bearer {api_key}"},
+            params={"marketHashName": market_hash},
+            timeout=10,
+        )
+        data = r.json()
+        if not data.get("success"):
+            return None
+        prices = [p.get("sellPrice") for p in data.get("data", []) if p.get("sellPrice")]
+        return min(prices) if prices else None
+    except Exception:
+        return None
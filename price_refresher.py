@@ -0,0 +1,125 @@
+import threading
+import time
+
+import bulk_fetch
+import price_client
+import refresh_priority
+
+# 后台刷新周期（秒）：每轮只增量拉旧价格，所以可以跑得勤一些
+REFRESH_INTERVAL = 120
+
+# 增量刷新每轮最多拉多少个旧价格（从没拉过的不算在内）
+INCREMENTAL_LIMIT = 20
+
+_jobs = {}
+_last_run = {}
+# case_key -> 上次 revalidate 真正提交刷新的时间（失败了也算）
+_last_revalidate = {}
+# case_key -> 是否全量刷新
+_pending = {}
+_running = set()
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_thread = None
+
+
+# ================== 注册 / 启动 ==================
+def register(case_key: str, hashes_fn, api_key):
+    """
+    注册一个页面的后台刷新任务
+    - hashes_fn(): 返回这个页面要保持新鲜的 marketHashName 列表
+    注册后会尽快跑第一轮（增量）
+    """
+    with _lock:
+        _jobs[case_key] = (hashes_fn, api_key)
+        _pending.setdefault(case_key, False)
+    _wakeup.set()
+
+
+def ensure_started():
+    """每个服务进程只启动一个后台线程，重复调用没关系"""
+    global _thread
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return
+        _thread = threading.Thread(target=_run, name="price-refresher", daemon=True)
+        _thread.start()
+
+
+def request_refresh(case_key: str | None = None, full: bool = True):
+    """
+    让后台线程马上刷新某个页面（None = 全部），不阻塞调用方
+    - full=True：全部重拉；False：只拉旧的
+    """
+    with _lock:
+        keys = list(_jobs) if case_key is None else [case_key]
+        for k in keys:
+            if k in _jobs:
+                _pending[k] = _pending.get(k, False) or full
+    _wakeup.set()
+
+
+def revalidate(case_key: str):
+    """
+    数据旧了时调用：提交一轮增量刷新，已经在排队或在跑就不重复提交
+    距上次提交不到 STALE_AFTER 也不提交（上游挂了 / 某个价一直拉不到时，不会一轮接一轮地打）
+    返回这次是否真的提交了刷新
+    """
+    now = time.time()
+    with _lock:
+        if case_key not in _jobs or case_key in _pending or case_key in _running:
+            return False
+        if now - _last_revalidate.get(case_key, 0) < refresh_priority.STALE_AFTER:
+            return False
+        _last_revalidate[case_key] = now
+        _pending[case_key] = False
+    _wakeup.set()
+    return True
+
+
+# ================== 状态查询 ==================
+def is_refreshing(case_key: str):
+    with _lock:
+        return case_key in _running or case_key in _pending
+
+
+# ================== 后台线程 ==================
+def _take_due_jobs():
+    now = time.time()
+    with _lock:
+        due = [
+            k for k in _jobs
+            if k in _pending or now - _last_run.get(k, 0) >= REFRESH_INTERVAL
+        ]
+        jobs = [(k, _jobs[k], _pending.pop(k, False)) for k in due]
+        _running.update(due)
+        return jobs
+
+
+def _seconds_until_next_due():
+    now = time.time()
+    with _lock:
+        if not _jobs:
+            return REFRESH_INTERVAL
+        next_due = min(_last_run.get(k, 0) + REFRESH_INTERVAL for k in _jobs)
+    return max(1.0, next_due - now)
+
+
+def _run():
+    while True:
+        _wakeup.clear()
+        for case_key, (hashes_fn, api_key), full in _take_due_jobs():
+            try:
+                hashes = hashes_fn()
+                if not full:
+                    hashes = price_client.stale_hashes(
+                        hashes, refresh_priority.STALE_AFTER, INCREMENTAL_LIMIT
+                    )
+                bulk_fetch.fetch_many(hashes, api_key)
+            except Exception:
+                pass
+            finally:
+                with _lock:
+                    _running.discard(case_key)
+                    _last_run[case_key] = time.time()
+        _wakeup.wait(timeout=_seconds_until_next_due())
@@ -0,0 +1,43 @@
+from types import MappingProxyType
+
+# 空的只读字典，evolve 往不存在的子字典里写时从它开始
+EMPTY = MappingProxyType({})
+
+
+def freeze(obj):
+    """
+    把价格数据变成只读快照：
+    - dict -> MappingProxyType（改字段会直接报 TypeError）
+    - list / tuple -> tuple
+    递归处理，已经冻结的部分原样返回
+    """
+    if isinstance(obj, MappingProxyType):
+        return obj
+    if isinstance(obj, dict):
+        return MappingProxyType({k: freeze(v) for k, v in obj.items()})
+    if isinstance(obj, (list, tuple)):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+
+def _assoc(item, path, value):
+    key, rest = path[0], path[1:]
+    d = dict(item)
+    d[key] = _assoc(item.get(key, EMPTY), rest, value) if rest else freeze(value)
+    return MappingProxyType(d)
+
+
+def evolve(item, changes):
+    """
+    写时复制：返回改过几个字段的新快照，原快照不动
+    - changes: {key 或 (key, 子 key, ...): 新值}
+    没改到的字段 / 子字典和原快照共用同一个对象，不做深拷贝
+    """
+    for path, value in changes.items():
+        item = _assoc(item, path if isinstance(path, tuple) else (path,), value)
+    return item
+
+
+def replace_at(items, index: int, item):
+    """写时复制：返回把第 index 个换成 item 的新 tuple，其余元素共用"""
+    return items[:index] + (item,) + items[index + 1:]
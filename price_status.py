@@ -0,0 +1,61 @@
+import time
+
+import streamlit as st
+
+import price_refresher
+import price_store
+import refresh_priority
+
+# 后台刷新期间，多久检查一次是否拉完
+POLL_SECONDS = 3
+
+
+def format_age(seconds):
+    if seconds is None:
+        return "未知"
+    if seconds < 60:
+        return "刚刚"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} 分钟前"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} 小时前"
+    return f"{int(seconds // 86400)} 天前"
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def _watch_refresh(case_key: str, text: str, seen):
+    # 价格库真的有新价格了 -> 整页重跑，图表换成新价格；
+    # 一轮拉完但什么都没拉到（上游挂了）就只更新这行字，不重跑页面
+    if price_store.version() != seen:
+        st.rerun()
+    if price_refresher.is_refreshing(case_key):
+        st.caption(text + "（后台更新中，有新价格会自动刷新）")
+    else:
+        st.caption(text)
+
+
+def render_freshness(case_key: str, fetched_ats):
+    """
+    stale-while-revalidate：
+    页面先用手上已有的价格直接画，这里只显示价格有多旧；
+    最旧的价格超过 STALE_AFTER 就提交一轮后台增量刷新（同一页面 STALE_AFTER 内最多一次），
+    拉到新价格后自动重跑页面
+    - fetched_ats: 本页每个价格的拉取时间（None = 没拉过）
+    """
+    now = time.time()
+    ages = [max(0.0, now - t) for t in fetched_ats if t]
+    newest = min(ages) if ages else None
+    oldest = max(ages) if ages else None
+
+    if oldest is None or oldest > refresh_priority.STALE_AFTER:
+        price_refresher.revalidate(case_key)
+
+    text = f"🕒 价格更新于：最新 {format_age(newest)}，最旧 {format_age(oldest)}"
+    missing = len(fetched_ats) - len(ages)
+    if missing:
+        text += f"，{missing} 个还没拉到"
+
+    if price_refresher.is_refreshing(case_key):
+        _watch_refresh(case_key, text, price_store.version())
+    else:
+        st.caption(text)
@@ -0,0 +1,258 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+import persistence
+
+# ================== 基础配置 ==================
+# 四个页面共用一个价格库
+DB_FILE = Path("prices.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    case_key   TEXT NOT NULL,
+    item       TEXT NOT NULL,
+    tier       TEXT NOT NULL,
+    price      REAL NOT NULL,
+    fetched_at REAL NOT NULL,
+    volatility REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (case_key, item, tier)
+);
+CREATE INDEX IF NOT EXISTS idx_prices_case_fetched ON prices (case_key, fetched_at);
+
+-- 历史价格：(case, item, tier) 字典编码成整数 series_id，
+-- 时间存整数秒、价格存整数分，WITHOUT ROWID 按 (series_id, ts) 聚簇，
+-- 每个点只有几个字节，按时间范围查就是一段连续扫描
+CREATE TABLE IF NOT EXISTS series (
+    id       INTEGER PRIMARY KEY,
+    case_key TEXT NOT NULL,
+    item     TEXT NOT NULL,
+    tier     TEXT NOT NULL,
+    UNIQUE (case_key, item, tier)
+);
+CREATE TABLE IF NOT EXISTS price_history (
+    series_id   INTEGER NOT NULL,
+    ts          INTEGER NOT NULL,
+    price_cents INTEGER NOT NULL,
+    PRIMARY KEY (series_id, ts)
+) WITHOUT ROWID;
+"""
+
+# 价格没变时，最多隔多久也记一个点（秒），保证图上有连续的时间轴
+HISTORY_HEARTBEAT = 3600
+
+_conn = None
+_lock = threading.RLock()
+
+# 进程内缓存：series 的 id 和最后一个点，追加时不用每次回查
+_series_ids = {}
+_last_points = {}
+
+# 本进程写入次数，和 SQLite 的 data_version（别的进程写入）一起组成库版本
+_local_version = 0
+
+# case_key -> (库版本, 已构建的价格表)
+_table_cache = {}
+
+
+def _get_conn():
+    """
+    进程内共享一个连接（Streamlit 每次重跑都换线程，不适合每线程一个连接）
+    多进程之间靠 WAL + busy timeout 并发
+    """
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(DB_FILE, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _conn = conn
+    return _conn
+
+
+# ================== 写 ==================
+def upsert_prices(case_key: str, rows):
+    """
+    点更新：一次事务写若干行，每个 (物品, 档位) 只占一行
+    - rows: [(item, tier, price, fetched_at, volatility)]
+    比库里更旧的数据不会覆盖新的；同一事务里顺手追加历史价格
+    """
+    global _local_version
+    rows = list(rows)
+    if not rows:
+        return
+    with _lock:
+        conn = _get_conn()
+        _local_version += 1
+        with conn:
+            _append_history(conn, case_key, rows)
+            conn.executemany(
+                """
+                INSERT INTO prices (case_key, item, tier, price, fetched_at, volatility)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (case_key, item, tier) DO UPDATE SET
+                    price = excluded.price,
+                    fetched_at = excluded.fetched_at,
+                    volatility = excluded.volatility
+                WHERE excluded.fetched_at >= prices.fetched_at
+                """,
+                [(case_key, *r) for r in rows],
+            )
+
+
+def _series_id(conn, case_key: str, item: str, tier: str):
+    key = (case_key, item, tier)
+    sid = _series_ids.get(key)
+    if sid is None:
+        conn.execute(
+            "INSERT OR IGNORE INTO series (case_key, item, tier) VALUES (?, ?, ?)", key
+        )
+        sid = conn.execute(
+            "SELECT id FROM series WHERE case_key = ? AND item = ? AND tier = ?", key
+        ).fetchone()[0]
+        _series_ids[key] = sid
+    return sid
+
+
+def _last_point(conn, sid: int):
+    if sid not in _last_points:
+        _last_points[sid] = conn.execute(
+            "SELECT ts, price_cents FROM price_history WHERE series_id = ? ORDER BY ts DESC LIMIT 1",
+            (sid,),
+        ).fetchone()
+    return _last_points[sid]
+
+
+def _append_history(conn, case_key: str, rows):
+    """
+    只追加，不改旧点：
+    价格和上一个点一样、且离上一个点不到 HISTORY_HEARTBEAT 秒的，直接跳过
+    """
+    points = []
+    for item, tier, price, fetched_at, _volatility in rows:
+        sid = _series_id(conn, case_key, item, tier)
+        ts = int(fetched_at)
+        cents = int(round(price * 100))
+        last = _last_point(conn, sid)
+        if last is not None:
+            last_ts, last_cents = last
+            if ts <= last_ts:
+                continue
+            if cents == last_cents and ts - last_ts < HISTORY_HEARTBEAT:
+                continue
+        points.append((sid, ts, cents))
+        _last_points[sid] = (ts, cents)
+    conn.executemany(
+        "INSERT OR IGNORE INTO price_history (series_id, ts, price_cents) VALUES (?, ?, ?)",
+        points,
+    )
+
+
+# ================== 读 ==================
+def load_case(case_key: str):
+    """
+    只读某一页的行
+    返回 {(item, tier): (price, fetched_at, volatility)}
+    """
+    with _lock:
+        cur = _get_conn().execute(
+            "SELECT item, tier, price, fetched_at, volatility FROM prices WHERE case_key = ?",
+            (case_key,),
+        )
+        return {(item, tier): (price, fetched_at, vol) for item, tier, price, fetched_at, vol in cur}
+
+
+def query_history(case_key: str, item: str, tier: str, since: float | None = None, max_points: int = 500):
+    """
+    某个 (物品, 档位) 的历史价格，按时间升序 [(ts, price)]
+    点太多时按时间分桶取平均，最多 max_points 个，画几个月的数据也不卡
+    """
+    with _lock:
+        conn = _get_conn()
+        row = conn.execute(
+            "SELECT id FROM series WHERE case_key = ? AND item = ? AND tier = ?",
+            (case_key, item, tier),
+        ).fetchone()
+        if row is None:
+            return []
+        sid = row[0]
+        since_ts = int(since) if since is not None else 0
+
+        n, first_ts, last_ts = conn.execute(
+            "SELECT COUNT(*), MIN(ts), MAX(ts) FROM price_history WHERE series_id = ? AND ts >= ?",
+            (sid, since_ts),
+        ).fetchone()
+        if not n:
+            return []
+
+        if n <= max_points:
+            cur = conn.execute(
+                "SELECT ts, price_cents FROM price_history WHERE series_id = ? AND ts >= ? ORDER BY ts",
+                (sid, since_ts),
+            )
+            return [(ts, cents / 100) for ts, cents in cur]
+
+        bucket = max(1, (last_ts - first_ts) // max_points + 1)
+        cur = conn.execute(
+            """
+            SELECT MIN(ts), AVG(price_cents) FROM price_history
+            WHERE series_id = ? AND ts >= ?
+            GROUP BY (ts - ?) / ?
+            ORDER BY 1
+            """,
+            (sid, since_ts, first_ts, bucket),
+        )
+        return [(ts, cents / 100) for ts, cents in cur]
+
+
+def version():
+    """
+    价格库版本：本进程写过或别的进程提交过，版本就会变
+    （PRAGMA data_version 只反映其他连接的提交，所以再加上本进程的写入计数）
+    """
+    with _lock:
+        data_version = _get_conn().execute("PRAGMA data_version").fetchone()[0]
+        return _local_version, data_version
+
+
+def cached_table(case_key: str, build_fn):
+    """
+    进程内共享的只读价格表：
+    库版本没变就直接返回上次 build_fn(rows) 的结果，所有会话共用一份；
+    变了才重新读这一页的行再构建。调用方不要原地修改返回值
+    """
+    with _lock:
+        ver = version()
+        cached = _table_cache.get(case_key)
+        if cached is not None and cached[0] == ver:
+            return cached[1]
+        table = build_fn(load_case(case_key))
+        _table_cache[case_key] = (ver, table)
+        return table
+
+
+def has_case(case_key: str):
+    with _lock:
+        cur = _get_conn().execute("SELECT 1 FROM prices WHERE case_key = ? LIMIT 1", (case_key,))
+        return cur.fetchone() is not None
+
+
+# ================== 老数据导入 ==================
+def import_legacy_json(case_key: str, json_path: Path, rows_fn):
+    """
+    第一次启动时把老的 JSON 数据文件导入价格库（这一页库里已经有数据就跳过）
+    - rows_fn(data, file_mtime): 把 JSON 内容转成 upsert_prices 的行
+    加文件锁，多个进程同时启动也只导一次
+    返回导入的行数
+    """
+    if not json_path.exists():
+        return 0
+    with persistence.file_lock(DB_FILE):
+        if has_case(case_key):
+            return 0
+        with json_path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        rows = rows_fn(data, json_path.stat().st_mtime)
+        upsert_prices(case_key, rows)
+        return len(rows)
@@ -0,0 +1,33 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    令牌桶限速：每秒补 rate 个令牌，最多攒 capacity 个
+    进程内所有会话 / 线程共用一个桶，所以用 threading.Lock
+    令牌可以预支成负数，调用方按返回的等待时间排队
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def wait(self):
+        """在线程里阻塞到拿到令牌（bulk_fetch 的请求也是在线程池里发的）"""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,90 @@
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import streamlit as st
+
+import price_status
+from contract_planner import CONTRACT_SIZE
+
+# 四个页面并发扫描
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="recipe-scan")
+
+# 明细表最多列多少条配方
+MAX_DETAIL_ROWS = 50
+
+# 一种配方：5 把同一种材料，磨损都不超过 max_float，合出 tier
+# - unit_cost: 一把材料的价格
+# - outcome_avg / profit / roi / loss_prob: 见 ev_engine.EV
+Recipe = namedtuple("Recipe", ["tier", "material", "max_float", "unit_cost", "outcome_avg", "profit", "roi", "loss_prob"])
+
+
+def scan(engine, stats, unit_cost_fn):
+    """
+    按缓存价格扫一遍本页所有（成色, 材料）配方，按期望利润从高到低排
+    - engine: 反推表决定每种材料合出每个成色最多能用多少磨损
+    - stats: ev_engine.OutcomeStats，成品池各成色的价格
+    - unit_cost_fn(material, max_float): 磨损不超过 max_float 的这种材料一把多少钱，没价格返回 None
+    """
+    recipes = []
+    for t, tier in enumerate(engine.tier_names):
+        if stats.evaluate(tier, 0.0) is None:
+            continue
+        for m, material in enumerate(engine.materials):
+            max_float = engine.inverse[m, t]
+            if np.isnan(max_float):
+                continue
+            unit = unit_cost_fn(material, float(max_float))
+            if not unit:
+                continue
+            ev = stats.evaluate(tier, CONTRACT_SIZE * unit)
+            recipes.append(Recipe(tier, material, float(max_float), unit, ev.outcome_avg, ev.profit, ev.roi, ev.loss_prob))
+    recipes.sort(key=lambda r: r.profit, reverse=True)
+    return recipes
+
+
+def scan_cases(cases: dict):
+    """
+    并发扫描几个页面（每个模块的 scan_recipes 只读缓存价格，不拉价）
+    - cases: {显示名: 页面模块}
+    返回 [(显示名, 配方列表, 拉价时间列表)]
+    """
+    futures = {name: _EXECUTOR.submit(module.scan_recipes) for name, module in cases.items()}
+    return [(name, *f.result()) for name, f in futures.items()]
+
+
+def render_scanner(cases: dict):
+    """📈 首页：各页面最佳配方按每份合同期望利润排名"""
+    st.subheader("📈 今天炼哪个？各配方按每份合同期望利润排名")
+    st.caption(
+        "只用已缓存的价格，不拉价；5 把同一种材料，材料价取能用的磨损档位里最便宜的那档，"
+        "成品按池子里每件等概率。"
+    )
+
+    now = time.time()
+    ranking = []
+    details = []
+    for name, recipes, fetched in scan_cases(cases):
+        known = [ts for ts in fetched if ts]
+        best = recipes[0] if recipes else None
+        ranking.append({
+            "配方": name,
+            "成色": best.tier if best else "暂无价格",
+            "材料": best.material if best else "",
+            "材料磨损 ≤": best.max_float if best else None,
+            "材料成本": CONTRACT_SIZE * best.unit_cost if best else None,
+            "期望利润": best.profit if best else None,
+            "ROI": f"{best.roi:.1%}" if best else "",
+            "亏损概率": f"{best.loss_prob:.0%}" if best else "",
+            "价格最旧": price_status.format_age(now - min(known)) if known else "未知",
+            "没拉到": len(fetched) - len(known),
+        })
+        details.extend({"配方": name, **r._asdict()} for r in recipes)
+
+    ranking.sort(key=lambda r: float("-inf") if r["期望利润"] is None else r["期望利润"], reverse=True)
+    st.dataframe(ranking, use_container_width=True)
+
+    with st.expander("所有配方明细"):
+        details.sort(key=lambda r: r["profit"], reverse=True)
+        st.dataframe(details[:MAX_DETAIL_ROWS], use_container_width=True)
@@ -0,0 +1,54 @@
+import time
+
+# 价格超过这个秒数算旧，增量刷新只拉旧的
+STALE_AFTER = 600
+
+# 拉失败（上游没有这件的挂单 / 上游挂了）之后，隔多久才再试
+RETRY_FAILED_AFTER = STALE_AFTER
+
+# 波动 EWMA 平滑系数：越大越看重最近一次变化
+VOLATILITY_ALPHA = 0.3
+
+# 波动权重：相对涨跌 1% 大约相当于年龄多算 20%
+VOLATILITY_WEIGHT = 20
+
+
+def next_volatility(old_price, new_price, old_volatility: float = 0.0):
+    """用相对涨跌幅更新波动（EWMA），第一次拉价没有参照时保持原值"""
+    if not old_price:
+        return old_volatility
+    change = abs(new_price - old_price) / old_price
+    return (1 - VOLATILITY_ALPHA) * old_volatility + VOLATILITY_ALPHA * change
+
+
+def score(age: float, volatility: float):
+    return age * (1 + VOLATILITY_WEIGHT * volatility)
+
+
+def pick_stale(candidates, max_age: float = STALE_AFTER, limit: int | None = None, now: float | None = None):
+    """
+    增量刷新挑选：
+    - candidates: [(key, fetched_at 或 None, volatility, 上次拉失败的时间 或 None)]
+    - RETRY_FAILED_AFTER 内拉失败过的先跳过，不会每一轮都去打一个拉不到的价
+    - 从没拉过的要拉，排最前，不占 limit
+    - 其余只挑 age > max_age 的，按 年龄 × (1 + 波动) 从高到低，最多 limit 个
+    返回 key 列表
+    """
+    now = time.time() if now is None else now
+    never = []
+    stale = []
+    for key, fetched_at, volatility, failed_at in candidates:
+        if failed_at and now - failed_at < RETRY_FAILED_AFTER:
+            continue
+        if not fetched_at:
+            never.append(key)
+            continue
+        age = now - fetched_at
+        if age > max_age:
+            stale.append((score(age, volatility or 0.0), key))
+
+    stale.sort(key=lambda x: x[0], reverse=True)
+    keys = [k for _, k in stale]
+    if limit is not None:
+        keys = keys[:limit]
+    return never + keys
@@ -0,0 +1,147 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import streamlit as st
+from matplotlib.colors import TwoSlopeNorm
+
+# 扫描输入：成品均价、某件成品 / 某组成品的价格，或者某一种材料的单价
+AVG_INPUT = "成品均价"
+ITEM_PREFIX = "成品："
+FINISH_PREFIX = "同皮肤："
+KIND_PREFIX = "同款："
+
+# 每个轴取多少个点（二维时格子数是平方）
+GRID_OPTIONS = [50, 100, 200]
+
+
+def _split(name: str):
+    # "蝴蝶刀｜多普勒" / "裹手 | 蟒蛇" -> ("蝴蝶刀", "多普勒")
+    for sep in ("｜", "|"):
+        if sep in name:
+            kind, finish = name.split(sep, 1)
+            return kind.strip(), finish.strip()
+    return name, ""
+
+
+def outcome_inputs(outcomes):
+    """
+    成品池里能扫的输入 {显示名: 成员名列表}
+    - 同皮肤 / 同款：一组成品一起涨跌（比如所有多普勒），只有一件的组不单列
+    - 成品：单件成品
+    """
+    finishes, kinds = {}, {}
+    for name, _ in outcomes:
+        kind, finish = _split(name)
+        if finish:
+            finishes.setdefault(f"{FINISH_PREFIX}{finish}", []).append(name)
+        kinds.setdefault(f"{KIND_PREFIX}{kind}", []).append(name)
+    inputs = {label: names for label, names in (*finishes.items(), *kinds.items()) if len(names) > 1}
+    inputs.update((f"{ITEM_PREFIX}{name}", [name]) for name, _ in outcomes)
+    return inputs
+
+
+def sweep(outcomes, materials, x_input, x_values, y_input=None, y_values=None):
+    """
+    一次广播算完整张网格上的期望利润
+    - outcomes: 成品池里每件 [(名字, 价格)]
+    - materials: 5 把材料 [(名字, 单价)]
+    - x_input / y_input: AVG_INPUT、outcome_inputs 里的成品输入（扫这组成品的均价），
+      或材料名（扫这种材料的单价，选了几把就按几把算）
+    返回利润网格 (len(y_values), len(x_values))；只扫一个输入时 y 维长度为 1
+    """
+    names = [n for n, _ in outcomes]
+    prices = np.array([p for _, p in outcomes], dtype=float)
+    groups = outcome_inputs(outcomes)
+    x_values = np.asarray(x_values, dtype=float)[None, :]
+    y_values = np.ones((1, 1)) if y_input is None else np.asarray(y_values, dtype=float)[:, None]
+
+    # 成品均价 = 池里每件等概率；一组 k 件的均价从 base 变到 v，整池均价变 k/n * (v - base)
+    outcome_avg = np.full((1, 1), prices.mean())
+    shift = np.zeros((1, 1))
+    cost = np.full((1, 1), sum(p for _, p in materials))
+    for inp, values in ((x_input, x_values), (y_input, y_values)):
+        if inp is None:
+            continue
+        if inp == AVG_INPUT:
+            outcome_avg = values
+        elif inp in groups:
+            member = np.isin(names, groups[inp])
+            shift = shift + member.sum() / len(prices) * (values - prices[member].mean())
+        else:
+            count = sum(1 for name, _ in materials if name == inp)
+            base = sum(p for name, p in materials if name == inp)
+            cost = cost - base + count * values
+    return np.broadcast_to(outcome_avg + shift - cost, (y_values.shape[0], x_values.shape[1]))
+
+
+def render_sensitivity(outcomes, materials, key_prefix: str, product: str):
+    """
+    🔥 敏感性扫描（各页面共用）：把一两个价格在当前值上下扫一遍，看期望利润怎么变
+    - outcomes: 当前材料合出的成色下，成品池里每件 [(名字, 价格)]
+    - materials: 当前 5 把材料 [(名字, 单价)]，有材料没价格时成本不准，不扫描
+    """
+    st.subheader("🔥 价格变了还赚吗？敏感性扫描")
+    if len(outcomes) == 0:
+        st.info(f"当前材料合出的成色还没有{product}价格，没法扫描。")
+        return
+    missing = [name for name, p in materials if not p]
+    if missing:
+        st.info(f"这些材料在当前磨损下还没有价格，成本不准，没法扫描：{'、'.join(dict.fromkeys(missing))}")
+        return
+
+    prices = dict(outcomes)
+    base = {AVG_INPUT: float(np.mean(list(prices.values())))}
+    for label, names in outcome_inputs(outcomes).items():
+        base[label] = float(np.mean([prices[n] for n in names]))
+    for name, p in materials:
+        base.setdefault(name, float(p))
+    inputs = [AVG_INPUT] + [f for f in base if f != AVG_INPUT]
+
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        x_input = st.selectbox("横轴", inputs, key=f"{key_prefix}_sens_x")
+    with c2:
+        y_choice = st.selectbox("纵轴", ["（不扫）"] + [i for i in inputs if i != x_input], key=f"{key_prefix}_sens_y")
+    with c3:
+        spread = st.slider("上下浮动 %", min_value=10, max_value=90, value=50, step=10, key=f"{key_prefix}_sens_spread")
+    with c4:
+        n = st.selectbox("每轴点数", GRID_OPTIONS, index=1, key=f"{key_prefix}_sens_grid")
+    y_input = None if y_choice == "（不扫）" else y_choice
+
+    def axis(inp):
+        return np.linspace(base[inp] * (1 - spread / 100), base[inp] * (1 + spread / 100), n)
+
+    x_values = axis(x_input)
+    y_values = axis(y_input) if y_input else None
+    profit = sweep(outcomes, materials, x_input, x_values, y_input, y_values)
+
+    if y_input is None:
+        fig, ax = plt.subplots(figsize=(10, 3.5))
+        ax.plot(x_values, profit[0])
+        ax.axhline(0, linestyle="--", color="gray")
+        ax.axvline(base[x_input], linestyle=":", color="gray")
+        ax.set_xlabel(x_input)
+        ax.set_ylabel("期望利润 (¥)")
+        ax.set_title("期望利润随价格变化（虚线 = 保本，点线 = 当前价）")
+        st.pyplot(fig)
+        return
+
+    lo, hi = float(profit.min()), float(profit.max())
+    norm = TwoSlopeNorm(0.0, lo, hi) if lo < 0 < hi else None
+    fig, ax = plt.subplots(figsize=(10, 6))
+    im = ax.imshow(
+        profit,
+        origin="lower",
+        aspect="auto",
+        extent=(x_values[0], x_values[-1], y_values[0], y_values[-1]),
+        cmap="RdYlGn",
+        norm=norm,
+    )
+    if norm is not None:
+        ax.contour(x_values, y_values, profit, levels=[0.0], colors="black", linewidths=1)
+    ax.plot(base[x_input], base[y_input], "k+", markersize=12)
+    ax.set_xlabel(x_input)
+    ax.set_ylabel(y_input)
+    ax.set_title(f"{n}×{n} 个点的期望利润（黑线 = 保本，+ = 当前价）")
+    fig.colorbar(im, ax=ax, label="期望利润 (¥)")
+    st.pyplot(fig)
+    st.caption(f"扫描范围内期望利润 {lo:.2f} ~ {hi:.2f} 元。")
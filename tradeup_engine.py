@@ -0,0 +1,105 @@
+from collections import namedtuple
+
+import numpy as np
+
+# evaluate 的结果，都是 numpy 数组
+# - mapped: 每把材料映射到成品的磨损，形状和输入一样 (N, 5)
+# - avg: 每组 5 把的平均，也就是成品磨损 (N,)
+# - tier: 成品档位下标，对应 engine.tier_names，匹配不到是 -1 (N,)
+TradeUpResult = namedtuple("TradeUpResult", ["mapped", "avg", "tier"])
+
+
+class TradeUpEngine:
+    """
+    炼金结果批量计算（NumPy 向量化）：
+    材料磨损 -> 在材料区间里的相对位置 -> 线性映射到成品区间 -> 取平均 -> 分档
+    一次调用算几千上万组材料，页面计算器和批量分析共用这一份
+    反推表（每把材料要合出每个档位最多能用多少磨损）在构造时一次算好
+    """
+
+    def __init__(self, wear_range: dict, out_min: float, out_max: float, tiers: dict):
+        self.materials = list(wear_range)
+        self.mat_min = np.array([wear_range[m][0] for m in self.materials], dtype=float)
+        self.mat_max = np.array([wear_range[m][1] for m in self.materials], dtype=float)
+        self.out_min = float(out_min)
+        self.out_max = float(out_max)
+        self.tier_names = list(tiers)
+        self.tier_lo = np.array([lo for lo, _ in tiers.values()], dtype=float)
+        self.tier_hi = np.array([hi for _, hi in tiers.values()], dtype=float)
+        self._index = {m: i for i, m in enumerate(self.materials)}
+        self.inverse = self._inverse_table()
+
+    def _inverse_table(self):
+        """
+        反推表 (材料数, 档位数)：要合出某个档位（磨损 ≤ 档位上限），这把材料最高能用多少磨损
+        按 map_floats 的线性映射反推；档位上限比成品下限还低、合不出来的是 NaN
+        """
+        ratio = (self.tier_hi - self.out_min) / (self.out_max - self.out_min)
+        ratio = np.where(ratio < 0, np.nan, np.minimum(ratio, 1.0))
+        table = self.mat_min[:, None] + ratio[None, :] * (self.mat_max - self.mat_min)[:, None]
+        table = np.minimum(table, self.mat_max[:, None])
+        table.flags.writeable = False
+        return table
+
+    def max_material_float(self, material: str, tier: str):
+        """查反推表：material 要合出 tier 最高能用多少磨损，不在表里 / 合不出来返回 None"""
+        if material not in self._index or tier not in self.tier_names:
+            return None
+        v = self.inverse[self._index[material], self.tier_names.index(tier)]
+        return None if np.isnan(v) else float(v)
+
+    def lookup(self, names):
+        """材料枪名（可以是嵌套列表）-> 下标数组，不在 WEAR_RANGE 里的是 -1"""
+        names = np.asarray(names, dtype=object)
+        return np.vectorize(lambda n: self._index.get(n, -1), otypes=[np.intp])(names)
+
+    def material_index(self, names):
+        """材料枪名（可以是嵌套列表）-> 下标数组；不在 WEAR_RANGE 里的名字报 ValueError"""
+        names = np.asarray(names, dtype=object)
+        idx = self.lookup(names)
+        if (idx < 0).any():
+            unknown = sorted(set(names[idx < 0].tolist()))
+            raise ValueError(f"WEAR_RANGE 里没有这些材料：{'、'.join(unknown)}")
+        return idx
+
+    def map_floats(self, mat_idx, floats):
+        """
+        每把材料的磨损 -> 成品磨损（逐元素，形状不变）
+        材料磨损先夹到材料区间内，结果夹到成品区间内，保留 6 位小数
+        材料区间配置不合法（max <= min）的位置是 NaN
+        """
+        mat_idx = np.asarray(mat_idx, dtype=np.intp)
+        floats = np.asarray(floats, dtype=float)
+        m_min = self.mat_min[mat_idx]
+        m_max = self.mat_max[mat_idx]
+        span = m_max - m_min
+        valid = span > 0
+        pos = (np.clip(floats, m_min, m_max) - m_min) / np.where(valid, span, 1.0)
+        out = self.out_min + pos * (self.out_max - self.out_min)
+        out = np.round(np.clip(out, self.out_min, self.out_max), 6)
+        return np.where(valid, out, np.nan)
+
+    def classify(self, out_floats):
+        """成品磨损 -> 档位下标（lo <= f <= hi，边界上取 tiers 里靠前的那档），匹配不到是 -1"""
+        out_floats = np.asarray(out_floats, dtype=float)
+        tier = np.full(out_floats.shape, -1, dtype=np.intp)
+        for i in range(len(self.tier_names) - 1, -1, -1):
+            hit = (out_floats >= self.tier_lo[i]) & (out_floats <= self.tier_hi[i])
+            tier = np.where(hit, i, tier)
+        return tier
+
+    def evaluate(self, mat_idx, floats):
+        """
+        批量算炼金结果
+        - mat_idx: (N, k) 材料下标（material_index 的结果）
+        - floats: (N, k) 对应的材料磨损
+        返回 TradeUpResult
+        """
+        mapped = self.map_floats(mat_idx, floats)
+        avg = mapped.mean(axis=-1)
+        return TradeUpResult(mapped, avg, self.classify(avg))
+
+    def tier_name(self, tier_idx):
+        """档位下标 -> 档位名，-1 返回 None"""
+        tier_idx = int(tier_idx)
+        return self.tier_names[tier_idx] if tier_idx >= 0 else None